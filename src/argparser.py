@@ -3,11 +3,12 @@ import enum
 import sys
 from argparse import Namespace
 from io import TextIOWrapper
-from typing import Any, List
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import sympy as sp  # type: ignore
 
-from config import MAX_STARTING_SUBDIVISIONS
+from config import CACHE_SIZE, EPS, MAX_STARTING_SUBDIVISIONS, WRITER_FLUSH_EVERY
 from logger import GlobalLogger, LogLevel
 from solvers.rect_solver import RectStrategy
 from utils.math import f_str_expr_to_sp_lambda
@@ -22,6 +23,11 @@ class SolutionMethod(enum.Enum):
     RECT = "rect"
     TRAP = "trap"
     SIMPSON = "simpson"
+    TANH_SINH = "tanh-sinh"
+    CLENSHAW_CURTIS = "clenshaw-curtis"
+    FILON = "filon"
+    GAUSS = "gauss"
+    SOBOL = "sobol"
 
 
 class ArgParser:
@@ -36,10 +42,29 @@ class ArgParser:
     method: SolutionMethod
     rect_strategy: RectStrategy
     subdivisions: int
+    eps: sp.Float
     output_format: OutputFormat
+    flush_every: int
 
     # args
     verbose: bool = False
+    batch: bool = False
+    skip_invalid: bool = False
+    native_floats: bool = False
+    cache_size: int = CACHE_SIZE
+    cache_file: str | None = None
+    max_iterations: int | None = None
+    max_evals: int | None = None
+    time_limit: float | None = None
+    workers: int = 0
+    closed_form: bool = False
+    mixed_precision: bool = True
+    save_state_file: str | None = None
+    resume_file: str | None = None
+    params: Dict[str, np.ndarray]
+    intervals: List[Tuple[float, float]]
+    data_file: str | None = None
+    box: List[Tuple[float, float]]
 
     def _register_args(self) -> None:
         self.parser.add_argument("-h", "--help", action="store_true", help="shows help")
@@ -98,6 +123,60 @@ class ArgParser:
             default=4,
             help="starting number of subdivisions",
         )
+        self.parser.add_argument(
+            "--eps",
+            action="store",
+            type=str,
+            default=str(EPS),
+            help="target accuracy (Runge error estimate)",
+        )
+        self.parser.add_argument(
+            "--max-iterations",
+            action="store",
+            type=int,
+            help="max Runge doublings per (sub)interval (default 15)",
+        )
+        self.parser.add_argument(
+            "--max-evals",
+            action="store",
+            type=int,
+            help="function evaluation budget per solve",
+        )
+        self.parser.add_argument(
+            "--time-limit",
+            action="store",
+            type=float,
+            help="time limit per solve, seconds",
+        )
+        self.parser.add_argument(
+            "--workers",
+            action="store",
+            type=int,
+            default=0,
+            help="compute this many Runge levels ahead in parallel processes (speculative)",
+        )
+        self.parser.add_argument(
+            "--closed-form",
+            action="store_true",
+            help="try exact (symbolic) integration first for polynomial, rational and simple elementary functions",
+        )
+        self.parser.add_argument(
+            "--exact",
+            action="store_true",
+            help="evaluate every level in full precision (default: float64, escalating near roundoff)",
+        )
+        self.parser.add_argument(
+            "--save-state",
+            action="store",
+            type=str,
+            help="save the final runge state to a file (for --resume)",
+        )
+        self.parser.add_argument(
+            "--resume",
+            action="store",
+            type=str,
+            help="continue refining from a state saved with --save-state (e.g. with a smaller --eps)",
+        )
         self.parser.add_argument(
             "-o",
             "--output-file",
@@ -112,6 +191,103 @@ class ArgParser:
             choices=[e.value for e in OutputFormat],
             default=OutputFormat.PLAIN.value,
         )
+        self.parser.add_argument(
+            "--flush-every",
+            action="store",
+            type=int,
+            default=WRITER_FLUSH_EVERY,
+            help="records buffered between flushes (jsonl/csv formats)",
+        )
+        self.parser.add_argument(
+            "--batch",
+            action="store_true",
+            help="solve every preset of input_file (JSON Lines or JSON array), streaming",
+        )
+        self.parser.add_argument(
+            "--skip-invalid",
+            action="store_true",
+            help="in batch mode, log and skip invalid presets instead of aborting",
+        )
+        self.parser.add_argument(
+            "--native-floats",
+            action="store_true",
+            help="in batch mode, keep preset bounds as native floats (compact)",
+        )
+        self.parser.add_argument(
+            "--cache-size",
+            action="store",
+            type=int,
+            default=CACHE_SIZE,
+            help="in-memory solution cache entries (0 disables)",
+        )
+        self.parser.add_argument(
+            "--cache-file",
+            action="store",
+            type=str,
+            help="persistent solution cache (sqlite file)",
+        )
+        self.parser.add_argument(
+            "--param",
+            action="append",
+            default=[],
+            metavar="NAME=START:STOP:COUNT",
+            help="sweep a parameter of f_expr over a linspace (repeatable, cartesian grid)",
+        )
+        self.parser.add_argument(
+            "--intervals",
+            action="store",
+            type=str,
+            metavar="A:B,C:D,...|@FILE",
+            help="integrate over many sub-intervals of the preset's interval via an antiderivative index (@FILE: one 'a b' pair per line)",
+        )
+        self.parser.add_argument(
+            "--data",
+            action="store",
+            type=str,
+            metavar="FILE",
+            help="integrate tabulated samples instead of an expression (.npy, .csv or raw float64)",
+        )
+        self.parser.add_argument(
+            "--data-columns",
+            action="store",
+            type=int,
+            choices=[1, 2],
+            default=1,
+            help="raw data: 1 (y only) or 2 (interleaved x, y)",
+        )
+        self.parser.add_argument(
+            "--x0",
+            action="store",
+            type=float,
+            default=0.0,
+            help="data without x: first sample's x",
+        )
+        self.parser.add_argument(
+            "--dx",
+            action="store",
+            type=float,
+            default=1.0,
+            help="data without x: sample spacing",
+        )
+        self.parser.add_argument(
+            "--box",
+            action="store",
+            type=str,
+            metavar="XL:XR,YL:YR[,ZL:ZR]",
+            help="integrate f(x, y[, z]) from --f-expr over a box (tensor rule of --method, or sobol)",
+        )
+        self.parser.add_argument(
+            "--profile",
+            action="store",
+            type=str,
+            metavar="PREFIX",
+            help="profile the run, writes PREFIX.pstats and PREFIX.collapsed (flame graph)",
+        )
+        self.parser.add_argument(
+            "--profile-memory",
+            action="store_true",
+            help="with --profile, also trace allocations (PREFIX.memory.txt; slow)",
+        )
         self.parser.add_argument(
             "input_file",
             nargs="?",
@@ -123,6 +299,20 @@ class ArgParser:
         self.parser = argparse.ArgumentParser(add_help=False)
         self._register_args()
         self.presets = presets
+        self.params = {}
+        self.intervals = []
+        self.box = []
+
+    def peek_profile_args(self) -> Tuple[str | None, bool]:
+        """
+        --profile and --profile-memory, read before the full parse so that
+        argument parsing itself can be profiled
+        """
+        parser = argparse.ArgumentParser(add_help=False)
+        parser.add_argument("--profile", action="store", type=str)
+        parser.add_argument("--profile-memory", action="store_true")
+        args, _ = parser.parse_known_args()
+        return args.profile, args.profile_memory
 
     def parse_and_validate_args(self) -> int:
         self.args = self.parser.parse_args()
@@ -139,8 +329,48 @@ class ArgParser:
 
         if self.args.input_file is not None:
             self.in_stream = self.args.input_file
-        self.preset = self._get_preset()
-        print("using preset:", self.preset)
+        if self.args.output_file is not None:
+            self.out_stream = self.args.output_file
+        self.output_format = OutputFormat(self.args.format)
+
+        self.batch = self.args.batch
+        self.skip_invalid = self.args.skip_invalid
+        self.native_floats = self.args.native_floats
+        self.params = self._parse_params(self.args.param)
+        if self.batch and self.params:
+            logger.error("--param is not supported in batch mode")
+            exit(1)
+        if self.args.intervals is not None:
+            self.intervals = self._parse_intervals(self.args.intervals)
+            if self.batch or self.params:
+                logger.error("--intervals is not supported in batch or sweep mode")
+                exit(1)
+        self.data_file = self.args.data
+        if self.data_file is not None and (self.batch or self.params or self.intervals):
+            logger.error("--data is not supported in batch, sweep or intervals mode")
+            exit(1)
+        if self.args.box is not None:
+            self.box = self._parse_box(self.args.box)
+            if self.batch or self.params or self.intervals or self.data_file:
+                logger.error(
+                    "--box is not supported in batch, sweep, intervals or data mode"
+                )
+                exit(1)
+        if self.batch:
+            if self.args.input_file is None:
+                logger.error("batch mode requires input_file")
+                exit(1)
+        elif self.box:
+            if self.args.f_expr is None:
+                raise ValueError("function expression is required (--f-expr <expr>)")
+            self._validate_f_expr(self.args.f_expr)
+        elif self.data_file is not None:
+            if self.args.dx <= 0:
+                logger.error("dx must be greater than 0")
+                exit(1)
+        else:
+            self.preset = self._get_preset()
+            print("using preset:", self.preset)
 
         self.method = SolutionMethod(self.args.method)
         self.rect_strategy = RectStrategy(self.args.rect_strategy)
@@ -153,6 +383,54 @@ class ArgParser:
             logger.error(f"subdivisions must be less than {MAX_STARTING_SUBDIVISIONS}")
             exit(1)
 
+        try:
+            self.eps = to_sp_float(self.args.eps)
+        except ValueError as e:
+            logger.error(f"invalid eps: {e}")
+            exit(1)
+        if not self.eps > 0:
+            logger.error("eps must be greater than 0")
+            exit(1)
+        self.max_iterations = self.args.max_iterations
+        self.max_evals = self.args.max_evals
+        self.time_limit = self.args.time_limit
+        if self.max_iterations is not None and self.max_iterations < 0:
+            logger.error("max-iterations must not be negative")
+            exit(1)
+        if self.max_evals is not None and self.max_evals <= 0:
+            logger.error("max-evals must be greater than 0")
+            exit(1)
+        if self.time_limit is not None and self.time_limit <= 0:
+            logger.error("time-limit must be greater than 0")
+            exit(1)
+        self.workers = self.args.workers
+        self.closed_form = self.args.closed_form
+        self.mixed_precision = not self.args.exact
+        if self.workers < 0:
+            logger.error("workers must not be negative")
+            exit(1)
+
+        self.save_state_file = self.args.save_state
+        self.resume_file = self.args.resume
+        if (
+            self.batch or self.params or self.intervals or self.data_file or self.box
+        ) and (self.save_state_file or self.resume_file):
+            logger.error(
+                "--save-state and --resume are only supported for single expressions"
+            )
+            exit(1)
+
+        self.cache_size = self.args.cache_size
+        self.cache_file = self.args.cache_file
+        if self.cache_size < 0:
+            logger.error("cache-size must not be negative")
+            exit(1)
+
+        self.flush_every = self.args.flush_every
+        if self.flush_every <= 0:
+            logger.error("flush-every must be greater than 0")
+            exit(1)
+
         return 0
 
     def _get_preset(self) -> Preset:
@@ -165,10 +443,6 @@ class ArgParser:
         interval_l: sp.Float | None = None
         interval_r: sp.Float | None = None
 
-        if self.args.output_file is not None:
-            self.out_stream = self.args.output_file
-        self.output_format = OutputFormat(self.args.format)
-
         if self.args.preset:
             try:
                 res = self.find_preset(self.args.preset)
@@ -230,9 +504,68 @@ class ArgParser:
 
         return preset
 
+    def _parse_params(self, specs: List[str]) -> Dict[str, np.ndarray]:
+        params: Dict[str, np.ndarray] = {}
+        for spec in specs:
+            name, sep, grid = spec.partition("=")
+            parts = grid.split(":")
+            if not sep or len(parts) != 3:
+                raise ValueError(
+                    f"invalid --param {spec!r}, expected NAME=START:STOP:COUNT"
+                )
+            name = name.strip()
+            if name in params:
+                raise ValueError(f"parameter {name!r} is given twice")
+            try:
+                start, stop, count = float(parts[0]), float(parts[1]), int(parts[2])
+            except ValueError:
+                raise ValueError(f"invalid --param {spec!r} range")
+            if count <= 0:
+                raise ValueError(f"--param {name}: count must be greater than 0")
+            params[name] = np.linspace(start, stop, count)
+        return params
+
+    def _parse_intervals(self, spec: str) -> List[Tuple[float, float]]:
+        if spec.startswith("@"):
+            with open(spec[1:], "r") as f:
+                pairs = [line.split() for line in f if line.strip()]
+        else:
+            pairs = [item.split(":") for item in spec.split(",") if item.strip()]
+        intervals: List[Tuple[float, float]] = []
+        for i, pair in enumerate(pairs):
+            if len(pair) != 2:
+                raise ValueError(f"invalid interval #{i + 1}: {pair}")
+            try:
+                intervals.append((float(pair[0]), float(pair[1])))
+            except ValueError:
+                raise ValueError(f"invalid interval #{i + 1}: {pair}")
+        if not intervals:
+            raise ValueError("--intervals: no intervals given")
+        return intervals
+
+    def _parse_box(self, spec: str) -> List[Tuple[float, float]]:
+        box: List[Tuple[float, float]] = []
+        for i, item in enumerate(spec.split(",")):
+            pair = item.split(":")
+            if len(pair) != 2:
+                raise ValueError(f"invalid --box range #{i + 1}: {item!r}")
+            try:
+                l, r = float(pair[0]), float(pair[1])
+            except ValueError:
+                raise ValueError(f"invalid --box range #{i + 1}: {item!r}")
+            if l > r:
+                raise ValueError(
+                    f"--box range #{i + 1}: left bound must be less than right bound"
+                )
+            box.append((l, r))
+        if not 2 <= len(box) <= 3:
+            raise ValueError(f"--box needs 2 or 3 ranges (x, y[, z]), got {len(box)}")
+        return box
+
     def _validate_f_expr(self, f_expr: str) -> str:
+        variables = ["y", "z"][: len(self.box) - 1]
         try:
-            f_str_expr_to_sp_lambda(f_expr)
+            f_str_expr_to_sp_lambda(f_expr, [*variables, *self.params])
         except ValueError as e:
             raise ValueError(f"invalid function expression: {e}")
         return f_expr
@@ -251,6 +584,19 @@ class ArgParser:
         print(
             "\t3. specify manually --f-expr <expr> --interval-l <float> --interval-r <float>"
         )
+        print("batch mode: --batch <input_file.jsonl> (one preset per line)")
+        print(
+            "sweep mode: --f-expr 'a*sin(a*x)' --param a=0.1:10:100 (one row per parameter point)"
+        )
+        print(
+            "data mode: --data samples.npy [--dx 0.01] (tabulated samples, rect/trap/simpson)"
+        )
+        print(
+            "intervals mode: --preset <name> --intervals 0:1,0.5:2 (sub-intervals of the preset's interval)"
+        )
+        print(
+            "box mode: --f-expr 'x*y*z' --box 0:1,0:2,0:1 --method gauss|simpson|...|sobol"
+        )
 
     def print_presets(self) -> None:
         print("available presets (use --preset <name/index>):")
@@ -8,8 +8,29 @@ EPS = sp.Float("0.01", PRECISION)
 INF_EPS = sp.Float("0.0001", PRECISION)
 DERIVATIVE_PRECISION = 0.0001
 SAMPLES_COUNT = 1000
+SINGULARITY_TIMEOUT = 5.0  # seconds for symbolic singularity detection
+PRESCREEN_BLOWUP = 1e8  # |f| this many times the median magnitude is suspicious
+PRESCREEN_PEAK = 4  # local |f| peaks this many times their neighbours are zoomed into
+PRESCREEN_MAX_PEAKS = 32  # largest local peaks zoomed into by the pre-screen
+SINGULARITY_TOLERANCE = 1e-12  # relative, for matching x against fixable singularities
 RUNGE_ERROR_THRESHOLD = sp.Float("1e6")
 MAX_STARTING_SUBDIVISIONS = int(2**14)
+READER_CHUNK_SIZE = 1 << 16  # characters read at a time when streaming presets
+CACHE_SIZE = 4096  # in-memory solution cache entries
+CLOSED_FORM_TIMEOUT = 2.0  # seconds for the exact integration fast path
+MIXED_PRECISION_SAFETY = 64  # float64 roundoff floor, in units of eps * sum|w*f|
+ANTIDERIVATIVE_DEGREE = 16  # chebyshev degree per antiderivative index piece
+ANTIDERIVATIVE_MAX_PIECES = 1 << 16
+TABULATED_CHUNK_SIZE = 1 << 20  # samples per chunk when streaming data files
+GAUSS_POINTS = 4  # gauss-legendre nodes per panel of the composite gauss rule
+BOX_CHUNK_POINTS = 1 << 21  # grid points evaluated at a time by box integrals
+BOX_MAX_POINTS = 1 << 28  # largest level of a box integral, without --max-evals
+QMC_SEED = 0  # scrambling seed of the sobol sequence (reproducible results)
+WRITER_FLUSH_EVERY = 1000  # records buffered by streaming writers between flushes
+# collapsed stacks below this share of the stage time are dropped
+PROFILE_MIN_SHARE = 1e-4
+PROFILE_MAX_DEPTH = 128  # frames per collapsed stack
+PROFILE_TOP_ALLOCATIONS = 25  # allocation sites listed with --profile-memory
 
 
 # ------- порошок уходи --------
@@ -1,19 +1,36 @@
+import json
+import sys
 from typing import List
 
+import numpy as np
+
 from argparser import ArgParser, SolutionMethod
 from logger import GlobalLogger, LogLevel
-from solvers.base_solver import BaseSolver
+from solvers.base_solver import BaseSolver, Solution
+from solvers.clenshaw_curtis_solver import ClenshawCurtisSolver
+from solvers.filon_solver import FilonSolver
+from solvers.gauss_solver import GaussSolver
 from solvers.rect_solver import RectSolver
 from solvers.simpson_solver import SimpsonSolver
+from solvers.sobol_solver import SobolSolver
+from solvers.tanh_sinh_solver import TanhSinhSolver
 from solvers.trap_solver import TrapSolver
-from utils.integrals import IntegralExpr
+from utils.antiderivative import AntiderivativeIndex
+from utils.cache import SolutionCache
+from utils.integrals import BoxIntegralExpr, IntegralExpr, ParametricFunctionExpr
 from utils.meta import colorful_error_trace
+from utils.profiler import GlobalProfiler
 from utils.reader import Preset, Reader
-from utils.writer import ResWriter
+from utils.result_table import ResultTable
+from utils.tabulated import TabulatedIntegral
+from utils.validation import to_sp_float
+from utils.writer import ResWriter, make_record
 
 if __name__ != "__main__":
     exit(0)
 
+profiler = GlobalProfiler()
+
 
 def _parse_presets() -> List[Preset]:
     presets_reader = Reader(open("src/presets.json", "r"))
@@ -23,6 +40,17 @@ def _parse_presets() -> List[Preset]:
 
 
 def _get_solver(parser: ArgParser) -> BaseSolver:
+    solver = _get_method_solver(parser)
+    solver.set_limits(parser.max_iterations, parser.max_evals, parser.time_limit)
+    solver.set_workers(parser.workers)
+    solver.set_closed_form(parser.closed_form)
+    solver.set_mixed_precision(parser.mixed_precision)
+    if parser.cache_size > 0 or parser.cache_file is not None:
+        solver.set_cache(SolutionCache(parser.cache_size, parser.cache_file))
+    return solver
+
+
+def _get_method_solver(parser: ArgParser) -> BaseSolver:
     method = parser.method
     if method == SolutionMethod.RECT:
         solver = RectSolver()
@@ -32,47 +60,318 @@ def _get_solver(parser: ArgParser) -> BaseSolver:
         return TrapSolver()
     if method == SolutionMethod.SIMPSON:
         return SimpsonSolver()
+    if method == SolutionMethod.TANH_SINH:
+        return TanhSinhSolver()
+    if method == SolutionMethod.CLENSHAW_CURTIS:
+        return ClenshawCurtisSolver()
+    if method == SolutionMethod.FILON:
+        return FilonSolver()
+    if method == SolutionMethod.GAUSS:
+        return GaussSolver()
+    if method == SolutionMethod.SOBOL:
+        return SobolSolver()
     return BaseSolver()
 
 
-def run() -> None:
-    parser = ArgParser(_parse_presets())
+def run_batch(parser: ArgParser) -> None:
     logger = GlobalLogger()
+    reader = Reader(parser.in_stream, native_floats=parser.native_floats)
+    writer = ResWriter(parser.out_stream or sys.stdout, parser.flush_every)
+    solver = _get_solver(parser)
+    solved, failed = 0, 0
     try:
-        parser.parse_and_validate_args()
+        for preset in reader.iter_presets(skip_invalid=parser.skip_invalid):
+            try:
+                with profiler.stage("solve"):
+                    f_str, ans = solver.solve_preset(
+                        preset, parser.subdivisions, parser.eps
+                    )
+            except Exception as e:
+                failed += 1
+                logger.error(f"{preset}: {e}")
+                continue
+            record = make_record(
+                f_str,
+                to_sp_float(preset.interval_l),
+                to_sp_float(preset.interval_r),
+                ans,
+            )
+            with profiler.stage("write"):
+                writer.write_record(record, parser.output_format)
+            solved += 1
+    except ValueError as e:
+        writer.flush()
+        logger.error(e)
+        exit(1)
+    writer.flush()
+    logger.info(f"batch finished: {solved} solved, {failed} failed")
+    if solver.cache is not None:
+        logger.info(solver.cache.stats())
+        solver.cache.destroy()
+
+
+def run_sweep(parser: ArgParser) -> None:
+    logger = GlobalLogger()
+    preset = parser.preset
+    assert preset is not None
+    names = list(parser.params)
+    grid = np.stack(
+        [g.ravel() for g in np.meshgrid(*parser.params.values(), indexing="ij")],
+        axis=1,
+    )
+    solver = _get_solver(parser)
+    try:
+        with profiler.stage("analyse"):
+            fn = ParametricFunctionExpr(preset.f_expr, names)
+        with profiler.stage("solve"):
+            solutions = solver.solve_sweep(
+                fn,
+                grid,
+                preset.interval_l,
+                preset.interval_r,
+                parser.subdivisions,
+                parser.eps,
+            )
     except Exception as e:
         logger.error(e)
+        logger.debug(colorful_error_trace(e))
+        exit(1)
+
+    table = ResultTable(extra_columns=names)
+    for point, solution in zip(grid, solutions):
+        table.append(fn.f_str(), preset.interval_l, preset.interval_r, solution, point)
+    with profiler.stage("write"):
+        writer = ResWriter(parser.out_stream or sys.stdout, parser.flush_every)
+        writer.write_records(table.records(), parser.output_format)
+        writer.flush()
+    converged = sum(bool(c) for c in table.converged)
+    logger.info(f"sweep finished: {converged}/{len(table)} converged")
+
+
+def run_intervals(parser: ArgParser) -> None:
+    logger = GlobalLogger()
+    preset = parser.preset
+    assert preset is not None
+    try:
+        with profiler.stage("analyse"):
+            integral = IntegralExpr(preset=preset)
+        with profiler.stage("solve"):
+            index = AntiderivativeIndex(
+                integral.fn, integral.interval_l, integral.interval_r, parser.eps
+            )
+            ls = np.array([a for a, _ in parser.intervals])
+            rs = np.array([b for _, b in parser.intervals])
+            values, bounds = index.integrate_many(ls, rs)
+    except Exception as e:
+        logger.error(e)
+        logger.debug(colorful_error_trace(e))
+        exit(1)
+    logger.info(f"{index}, built with {index.evaluations} evaluations")
+
+    table = ResultTable()
+    f_str = integral.fn.f_str()
+    for a, b, value, bound in zip(ls, rs, values, bounds):
+        table.append(
+            f_str,
+            a,
+            b,
+            Solution(
+                float(value),
+                len(index),
+                float(bound),
+                converged=bool(bound <= index.eps),
+            ),
+        )
+    with profiler.stage("write"):
+        writer = ResWriter(parser.out_stream or sys.stdout, parser.flush_every)
+        writer.write_records(table.records(), parser.output_format)
+        writer.flush()
+
+
+def _open_tabulated(parser: ArgParser) -> TabulatedIntegral:
+    path = parser.data_file
+    assert path is not None
+    x0, dx = parser.args.x0, parser.args.dx
+    if path.endswith(".npy"):
+        return TabulatedIntegral.from_npy(path, x0, dx)
+    if path.endswith(".csv"):
+        return TabulatedIntegral.from_csv(path, x0, dx)
+    return TabulatedIntegral.from_raw(path, parser.args.data_columns, x0, dx)
+
+
+def run_tabulated(parser: ArgParser) -> None:
+    logger = GlobalLogger()
+    solver = _get_method_solver(parser)
+    try:
+        with profiler.stage("analyse"):
+            integral = _open_tabulated(parser)
+        logger.debug("solving", integral)
+        with profiler.stage("solve"):
+            ans = solver.solve_tabulated(integral, parser.eps)
+    except Exception as e:
+        logger.error(e)
+        logger.debug(colorful_error_trace(e))
         exit(1)
-    GlobalLogger().set_min_level(LogLevel.DEBUG if parser.verbose else LogLevel.INFO)
-    GlobalLogger().debug("Verbose mode:", parser.verbose)
 
+    if parser.out_stream is not None:
+        with profiler.stage("write"):
+            writer = ResWriter(parser.out_stream, parser.flush_every)
+            record = make_record(
+                integral.fn.f_str(), integral.interval_l, integral.interval_r, ans
+            )
+            writer.write_record(record, parser.output_format)
+            writer.destroy()
+
+    print("================")
+    print("result:", ans.value)
+    print("samples:", ans.interval_count + 1)
+    print("error rate:", ans.error_rate)
+    if not ans.converged:
+        print("converged: False (error estimate above eps)")
+
+
+def run_box(parser: ArgParser) -> None:
+    logger = GlobalLogger()
+    solver = _get_method_solver(parser)
+    solver.set_limits(parser.max_iterations, parser.max_evals, parser.time_limit)
     try:
-        integral = IntegralExpr(preset=parser.preset)
+        with profiler.stage("analyse"):
+            integral = BoxIntegralExpr(parser.args.f_expr, parser.box)
+        logger.debug("solving", integral)
+        with profiler.stage("solve"):
+            ans = solver.solve_box(integral, parser.subdivisions, parser.eps)
     except Exception as e:
         logger.error(e)
         logger.debug(colorful_error_trace(e))
         exit(1)
-    logger.debug("solving integral", integral)
+
+    if parser.out_stream is not None:
+        with profiler.stage("write"):
+            writer = ResWriter(parser.out_stream, parser.flush_every)
+            record = make_record(
+                integral.fn.f_str(),
+                tuple(l for l, _ in integral.bounds),
+                tuple(r for _, r in integral.bounds),
+                ans,
+            )
+            writer.write_record(record, parser.output_format)
+            writer.destroy()
+
+    print("================")
+    print("result:", ans.value)
+    if isinstance(solver, SobolSolver):
+        print("points:", ans.interval_count)
+    else:
+        print("interval count (per axis):", ans.interval_count)
+    print("error rate:", ans.error_rate)
+    print("evaluations:", ans.evaluations)
+    if not ans.converged:
+        print("converged: False (best-so-far estimate)")
+
+
+def run() -> None:
+    parser = ArgParser(_parse_presets())
+    profiler.configure(*parser.peek_profile_args())
+    try:
+        _run(parser)
+    finally:
+        # also on exit(1), so failing runs can be attached to bug reports
+        profiler.dump()
+
+
+def _run(parser: ArgParser) -> None:
+    logger = GlobalLogger()
+    try:
+        with profiler.stage("parse"):
+            parser.parse_and_validate_args()
+    except Exception as e:
+        logger.error(e)
+        exit(1)
+    GlobalLogger().set_min_level(LogLevel.DEBUG if parser.verbose else LogLevel.INFO)
+    GlobalLogger().debug("Verbose mode:", parser.verbose)
+
+    if parser.batch:
+        run_batch(parser)
+        return
+    if parser.params:
+        run_sweep(parser)
+        return
+    if parser.intervals:
+        run_intervals(parser)
+        return
+    if parser.data_file is not None:
+        run_tabulated(parser)
+        return
+    if parser.box:
+        run_box(parser)
+        return
+
+    preset = parser.preset
+    assert preset is not None
+    logger.debug("solving preset", preset)
 
     solver = _get_solver(parser)
     try:
-        ans = solver.solve(integral, parser.subdivisions)
+        if parser.resume_file is not None:
+            with profiler.stage("analyse"):
+                integral = IntegralExpr(preset=preset)
+            f_str = integral.fn.f_str()
+            with open(parser.resume_file, "r") as f:
+                saved = solver.load_state(
+                    json.load(f), f_str, integral.interval_l, integral.interval_r
+                )
+            logger.info(f"resuming from {parser.resume_file}: {saved}")
+            with profiler.stage("solve"):
+                ans = solver.resume(integral, saved, parser.eps)
+        else:
+            # a cache hit skips building (and analysing) the IntegralExpr entirely;
+            # otherwise solve_preset runs it as a nested "analyse" stage
+            with profiler.stage("solve"):
+                f_str, ans = solver.solve_preset(
+                    preset, parser.subdivisions, parser.eps
+                )
     except Exception as e:
         logger.error(e)
         logger.debug(colorful_error_trace(e))
         exit(1)
+    if solver.cache is not None:
+        logger.debug(solver.cache.stats())
+        solver.cache.destroy()
+    if parser.save_state_file is not None:
+        with open(parser.save_state_file, "w") as f:
+            state = solver.dump_state(f_str, preset.interval_l, preset.interval_r, ans)
+            json.dump(state, f, indent=4)
+        logger.info(f"runge state saved to {parser.save_state_file}")
+    if parser.verbose:
+        try:
+            integral = IntegralExpr(preset=preset)
+            bound = solver.error_bound(integral, ans.interval_count)
+            logger.debug("theoretical error bound:", bound)
+        except Exception as e:
+            logger.debug("could not estimate theoretical error bound:", e)
 
     if parser.out_stream is not None:
         logger.info(
             f"writing result to {parser.out_stream.name} with format={parser.output_format}"
         )
-        writer = ResWriter(parser.out_stream)
-        writer.write_solution(integral, ans, parser.output_format)
+        with profiler.stage("write"):
+            writer = ResWriter(parser.out_stream, parser.flush_every)
+            record = make_record(
+                f_str,
+                to_sp_float(preset.interval_l),
+                to_sp_float(preset.interval_r),
+                ans,
+            )
+            writer.write_record(record, parser.output_format)
+            writer.destroy()
 
     print("================")
     print("result:", ans.value)
     print("interval count:", ans.interval_count)
     print("error rate:", ans.error_rate)
+    print("evaluations:", ans.evaluations)
+    if not ans.converged:
+        print("converged: False (best-so-far estimate)")
 
 
 run()
@@ -1,31 +1,176 @@
-from typing import List
+import math
+import multiprocessing
+import time
+from collections import deque
+from functools import reduce
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
 import sympy as sp  # type: ignore
 
-from config import EPS, INF_EPS, RUNGE_ERROR_THRESHOLD
+from config import (
+    BOX_CHUNK_POINTS,
+    BOX_MAX_POINTS,
+    CLOSED_FORM_TIMEOUT,
+    EPS,
+    INF_EPS,
+    MIXED_PRECISION_SAFETY,
+    RUNGE_ERROR_THRESHOLD,
+)
 from logger import GlobalLogger
-from utils.integrals import IntegralExpr
+from utils.cache import CacheKey, SolutionCache
+from utils.integrals import (
+    BoxIntegralExpr,
+    FunctionExpr,
+    IntegralExpr,
+    MultiFunctionExpr,
+    ParametricFunctionExpr,
+)
+from utils.math import Number, compile_batch_kernel, f_str_expr_to_sp_lambda
+from utils.profiler import GlobalProfiler
+from utils.reader import Preset
+from utils.tabulated import SampleAccumulator, TabulatedIntegral
 from utils.validation import to_sp_float
 
 logger = GlobalLogger()
+profiler = GlobalProfiler()
+
+
+class RungeState:
+    """
+    final state of the Runge doubling loop on one (sub)interval;
+    enough to continue refining from the last level
+    """
+
+    __slots__ = ("interval_l", "interval_r", "interval_count", "value", "prev_value")
+
+    interval_l: sp.Float
+    interval_r: sp.Float
+    interval_count: int  # last (finest) level
+    value: sp.Float  # estimate at interval_count
+    prev_value: sp.Float | None  # estimate at interval_count / 2, if computed
+
+    def __init__(
+        self,
+        interval_l: sp.Float,
+        interval_r: sp.Float,
+        interval_count: int,
+        value: sp.Float,
+        prev_value: sp.Float | None,
+    ):
+        self.interval_l = interval_l
+        self.interval_r = interval_r
+        self.interval_count = interval_count
+        self.value = value
+        self.prev_value = prev_value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "interval_l": str(self.interval_l),
+            "interval_r": str(self.interval_r),
+            "interval_count": self.interval_count,
+            "value": str(self.value),
+            "prev_value": None if self.prev_value is None else str(self.prev_value),
+        }
+
+    @staticmethod
+    def from_dict(obj: Dict[str, Any]) -> "RungeState":
+        return RungeState(
+            to_sp_float(obj["interval_l"]),
+            to_sp_float(obj["interval_r"]),
+            int(obj["interval_count"]),
+            to_sp_float(obj["value"]),
+            None if obj.get("prev_value") is None else to_sp_float(obj["prev_value"]),
+        )
+
+    def __str__(self) -> str:
+        interval_l, interval_r, interval_count = (
+            self.interval_l,
+            self.interval_r,
+            self.interval_count,
+        )
+        return f"RungeState({interval_l=}, {interval_r=}, {interval_count=})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
 
 
 class Solution:
-    value: sp.Float
+    __slots__ = (
+        "value",
+        "interval_count",
+        "error_rate",
+        "converged",
+        "evaluations",
+        "states",
+    )
+
+    value: sp.Float | float
     interval_count: int
-    error_rate: sp.Float
+    error_rate: sp.Float | float
+    # False if a limit (iterations, evaluations, time) was hit before reaching eps
+    converged: bool
+    evaluations: int
+    # one per solved (sub)interval, see BaseSolver.resume
+    states: List[RungeState]
 
-    def __init__(self, value: sp.Float, interval_count: int, error_rate: sp.Float):
+    def __init__(
+        self,
+        value: sp.Float | float,
+        interval_count: int,
+        error_rate: sp.Float | float,
+        states: List[RungeState] | None = None,
+        converged: bool = True,
+        evaluations: int = 0,
+    ):
         self.value = value
         self.interval_count = interval_count
         self.error_rate = error_rate
+        self.states = states or []
+        self.converged = converged
+        self.evaluations = evaluations
+
+    def to_native(self) -> "Solution":
+        """
+        copy with native float fields (compact storage; runge states dropped)
+        """
+        return Solution(
+            float(self.value),
+            self.interval_count,
+            float(self.error_rate),
+            converged=self.converged,
+            evaluations=self.evaluations,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "value": str(self.value),
+            "interval_count": self.interval_count,
+            "error_rate": str(self.error_rate),
+            "converged": self.converged,
+            "evaluations": self.evaluations,
+            "states": [state.to_dict() for state in self.states],
+        }
+
+    @staticmethod
+    def from_dict(obj: Dict[str, Any]) -> "Solution":
+        return Solution(
+            to_sp_float(obj["value"]),
+            int(obj["interval_count"]),
+            to_sp_float(obj["error_rate"]),
+            [RungeState.from_dict(state) for state in obj.get("states", [])],
+            converged=bool(obj.get("converged", True)),
+            evaluations=int(obj.get("evaluations", 0)),
+        )
 
     def __str__(self) -> str:
-        value, interval_count, error_rate = (
+        value, interval_count, error_rate, converged = (
             self.value,
             self.interval_count,
             self.error_rate,
+            self.converged,
         )
-        return f"Solution({value=}, {interval_count=}, {error_rate=})"
+        return f"Solution({value=}, {interval_count=}, {error_rate=}, {converged=})"
 
     def __repr__(self) -> str:
         return self.__str__()
@@ -34,10 +179,127 @@ class Solution:
 class BaseSolver:
     MAX_ITERATIONS = 15
     PRECISION_ORDER = 2
+    # solvers that never evaluate f at the bounds set this to skip the INF_EPS
+    # shift and to accept improper integrals with endpoint singularities
+    HANDLES_ENDPOINT_SINGULARITIES = False
+    # solvers whose compute() already runs in float64 set this to skip the
+    # mixed precision stage, which could only repeat the same arithmetic
+    COMPUTES_IN_FLOAT64 = False
+    # solvers whose error falls faster than any power of h set this;
+    # PRECISION_ORDER is then only a conservative placeholder, too low to
+    # predict the cost of eps from
+    CONVERGES_SPECTRALLY = False
+
+    cache: SolutionCache | None = None
+
+    # per-solve limits; None means unlimited
+    max_iterations: int = MAX_ITERATIONS
+    max_evals: int | None = None
+    time_limit: float | None = None  # seconds
+
+    # processes computing Runge levels ahead of time; < 2 means sequential
+    workers: int = 0
+    # try exact integration (IntegralExpr.closed_form) before the Runge loop
+    closed_form: bool = False
+    # run the Runge loop in float64 (nodes_and_weights), escalating to compute()
+    mixed_precision: bool = True
+
+    _evaluations: int = 0
+    _deadline: float | None = None
 
     def __init__(self) -> None:
         pass
 
+    def set_limits(
+        self,
+        max_iterations: int | None = None,
+        max_evals: int | None = None,
+        time_limit: float | None = None,
+    ) -> None:
+        if max_iterations is not None:
+            self.max_iterations = max_iterations
+        self.max_evals = max_evals
+        self.time_limit = time_limit
+
+    def set_workers(self, workers: int) -> None:
+        self.workers = workers
+
+    def set_closed_form(self, closed_form: bool) -> None:
+        self.closed_form = closed_form
+
+    def set_mixed_precision(self, mixed_precision: bool) -> None:
+        self.mixed_precision = mixed_precision
+
+    def evaluations_for(self, interval_count: int) -> int:
+        """
+        function evaluations made by compute() at the given subdivision
+        """
+        return interval_count + 1
+
+    def _start_budget(self) -> None:
+        self._evaluations = 0
+        self._deadline = (
+            None if self.time_limit is None else time.monotonic() + self.time_limit
+        )
+
+    def _count(self, interval_count: int) -> None:
+        self._evaluations += self.evaluations_for(interval_count)
+
+    def _limit_reached(self, next_interval_count: int, reserved: int = 0) -> str | None:
+        """
+        reason not to compute the next level, if any; reserved are evaluations
+        already committed but not counted yet (speculative levels in flight)
+        """
+        return self._budget_reason(self.evaluations_for(next_interval_count) + reserved)
+
+    def _budget_reason(self, evaluations: int) -> str | None:
+        """
+        reason not to make `evaluations` more evaluations, if any
+        """
+        if (
+            self.max_evals is not None
+            and self._evaluations + evaluations > self.max_evals
+        ):
+            return f"evaluation budget of {self.max_evals} would be exceeded"
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return f"time limit of {self.time_limit}s reached"
+        return None
+
+    def set_cache(self, cache: SolutionCache | None) -> None:
+        self.cache = cache
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # shipped to speculative workers, which never touch the cache
+        state = self.__dict__.copy()
+        state.pop("cache", None)
+        return state
+
+    def cache_params(self) -> Tuple[str, ...]:
+        """
+        solver parameters that affect the result (part of the cache key)
+        """
+        return (self.__class__.__name__,)
+
+    def cache_key(
+        self,
+        f_str: str,
+        interval_l: Number,
+        interval_r: Number,
+        interval_count: int,
+        eps: sp.Float,
+    ) -> CacheKey:
+        """
+        f_str must be normalized (as printed by sympy, see FunctionExpr.f_str)
+        """
+        return (
+            f_str,
+            str(to_sp_float(interval_l)),
+            str(to_sp_float(interval_r)),
+            *self.cache_params(),
+            str(interval_count),
+            str(to_sp_float(eps)),
+        )
+
     def get_h(
         self, interval_l: sp.Float, interval_r: sp.Float, interval_count: int
     ) -> sp.Float:
@@ -46,9 +308,130 @@ class BaseSolver:
     def compute(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
         raise NotImplementedError
 
+    def sample_accumulator(self) -> SampleAccumulator:
+        """
+        this rule as a streaming accumulator over tabulated samples
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support tabulated data"
+        )
+
+    def solve_tabulated(
+        self, integral: TabulatedIntegral, eps: sp.Float = EPS
+    ) -> Solution:
+        """
+        integrates sampled data in one streaming pass; the error is estimated
+        Runge-style against the same rule over every other sample (plus the
+        last one), accumulated in the same pass
+        returns a native float Solution (interval_count = samples - 1)
+        """
+        fine, coarse = self.sample_accumulator(), self.sample_accumulator()
+        count = 0
+        last: Tuple[np.ndarray, np.ndarray] | None = None
+        for xs, ys in integral.chunks():
+            fine.feed(xs, ys)
+            # global even indices only; count is the index of xs[0]
+            coarse.feed(xs[count % 2 :: 2], ys[count % 2 :: 2])
+            count += len(xs)
+            last = xs[-1:], ys[-1:]
+        assert last is not None
+        if (count - 1) % 2 == 1:
+            coarse.feed(*last)
+        value = fine.result()
+        error = (
+            abs(value - coarse.result()) / (2**self.PRECISION_ORDER - 1)
+            if count >= 3
+            else float("inf")
+        )
+        logger.debug(f"{integral}: {count} samples, value={value}, error={error}")
+        return Solution(
+            value, count - 1, error, converged=bool(error < eps), evaluations=0
+        )
+
+    def nodes_and_weights(
+        self, interval_l: float, interval_r: float, interval_count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        float64 quadrature rule of compute(): integral ~ sum(weights * f(nodes))
+        """
+        raise NotImplementedError
+
+    def error_trusted(self, integral_expr: IntegralExpr, interval_count: int) -> bool:
+        """
+        False while interval_count is too coarse for the Runge estimate to be
+        trusted; a level below eps is only accepted once it is
+        """
+        return True
+
+    def error_bound(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
+        """
+        theoretical (derivative-based) error bound for the given subdivision
+        """
+        raise NotImplementedError
+
     def solve(
         self, integral_expr: IntegralExpr, interval_count: int, eps: sp.Float = EPS
     ) -> Solution:
+        if self.cache is None:
+            return self._solve_split(integral_expr, interval_count, eps)
+        key = self.cache_key(
+            integral_expr.fn.f_str(),
+            integral_expr.interval_l,
+            integral_expr.interval_r,
+            interval_count,
+            eps,
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"cache hit for {integral_expr}")
+            return Solution.from_dict(cached)
+        solution = self._solve_split(integral_expr, interval_count, eps)
+        if solution.converged:
+            self.cache.put(key, solution.to_dict())
+        return solution
+
+    def solve_preset(
+        self, preset: Preset, interval_count: int, eps: sp.Float = EPS
+    ) -> Tuple[str, Solution]:
+        """
+        same as solve(IntegralExpr(preset=preset), ...), but on a cache hit the
+        IntegralExpr (singularity and continuity analysis) is never built
+        returns the normalized function string and the solution
+        """
+        if self.cache is None:
+            with profiler.stage("analyse"):
+                integral_expr = IntegralExpr(preset=preset)
+            return integral_expr.fn.f_str(), self.solve(
+                integral_expr, interval_count, eps
+            )
+        # same string as FunctionExpr.f_str() (Lambda.expr uses a dummy symbol)
+        f_str = str(f_str_expr_to_sp_lambda(preset.f_expr)(FunctionExpr.symbol))
+        key = self.cache_key(
+            f_str, preset.interval_l, preset.interval_r, interval_count, eps
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"cache hit for {preset}")
+            return f_str, Solution.from_dict(cached)
+        with profiler.stage("analyse"):
+            integral_expr = IntegralExpr(preset=preset)
+        solution = self._solve_split(integral_expr, interval_count, eps)
+        if solution.converged:
+            self.cache.put(key, solution.to_dict())
+        return f_str, solution
+
+    def _solve_split(
+        self, integral_expr: IntegralExpr, interval_count: int, eps: sp.Float = EPS
+    ) -> Solution:
+        """
+        solves on each piece between inf singularities inside the interval
+        """
+        self._start_budget()
+        if self.closed_form:
+            value = integral_expr.closed_form(CLOSED_FORM_TIMEOUT)
+            if value is not None:
+                return Solution(value, 0, to_sp_float(0), converged=True, evaluations=0)
+        integral_expr = self._finite(integral_expr)
         singularities = integral_expr.get_inf_singularities_in_interval()
         if len(singularities) == 0:
             return self._solve(integral_expr, interval_count, eps)
@@ -59,15 +442,7 @@ class BaseSolver:
         for s in sorted(singularities):
             logger.debug(f"computing integral on interval [{last_x}, {s}]")
             solutions.append(
-                self._solve(
-                    IntegralExpr(
-                        interval_l=last_x,
-                        interval_r=s,
-                        fn=integral_expr.fn,
-                    ),
-                    interval_count,
-                    eps,
-                )
+                self._solve(integral_expr.view(last_x, s), interval_count, eps)
             )
             last_x = s
         logger.debug(
@@ -75,21 +450,341 @@ class BaseSolver:
         )
         solutions.append(
             self._solve(
-                IntegralExpr(
-                    interval_l=last_x,
-                    interval_r=integral_expr.interval_r,
-                    fn=integral_expr.fn,
-                ),
+                integral_expr.view(last_x, integral_expr.interval_r),
                 interval_count,
                 eps,
             )
         )
+        return self._merge(solutions)
+
+    def _finite(self, integral_expr: IntegralExpr) -> IntegralExpr:
+        """
+        maps infinite intervals onto finite ones; whether the integral converges
+        is then judged by the runge sequence (see Solution.converged)
+        """
+        if integral_expr.is_improper() != 1:
+            return integral_expr
+        logger.info(
+            f"infinite interval [{integral_expr.interval_l}, {integral_expr.interval_r}]; mapping onto a finite one"
+        )
+        return integral_expr.to_finite()
+
+    def solve_many(
+        self,
+        fns: List[FunctionExpr],
+        interval_l: Number,
+        interval_r: Number,
+        interval_count: int,
+        eps: sp.Float = EPS,
+    ) -> List[Solution]:
+        """
+        integrates several functions over one shared interval in float64:
+        every Runge level builds a single node array and evaluates all still
+        unconverged functions on it as one 2D batch
+        returns one (native float) Solution per function
+        """
+        l, r = float(interval_l), float(interval_r)
+        for fn in fns:
+            inside = {s for s in fn.inf_singularities if l < s < r}
+            if inside:
+                raise ValueError(
+                    f"{fn} has singularities {inside} in [{l}, {r}]; use solve()"
+                )
+        kernels: Dict[Tuple[int, ...], Callable[[Any], np.ndarray]] = {}
+
+        def evaluate(xs: np.ndarray, active: np.ndarray) -> np.ndarray:
+            key = tuple(active)
+            if key not in kernels:
+                # recompiled only when the set of unconverged functions shrinks
+                kernels.clear()
+                kernels[key] = compile_batch_kernel(
+                    [fns[j].expr for j in active], FunctionExpr.symbol
+                )
+            ys = kernels[key](xs)
+            for row, j in enumerate(active):
+                ys[row] = fns[j].patch_fixable(xs, ys[row])
+            return ys
+
+        return self._solve_batch(evaluate, len(fns), l, r, interval_count, eps)
+
+    def solve_sweep(
+        self,
+        fn: ParametricFunctionExpr,
+        param_values: np.ndarray,
+        interval_l: Number,
+        interval_r: Number,
+        interval_count: int,
+        eps: sp.Float = EPS,
+    ) -> List[Solution]:
+        """
+        integrates f(x; p) for every row p of param_values, shape (m, len(params)),
+        with the kernel compiled once; see solve_many
+        """
+        param_values = np.asarray(param_values, dtype=np.float64).reshape(
+            -1, len(fn.params)
+        )
+
+        def evaluate(xs: np.ndarray, active: np.ndarray) -> np.ndarray:
+            return fn.compute_grid(xs, param_values[active])
+
+        return self._solve_batch(
+            evaluate,
+            len(param_values),
+            float(interval_l),
+            float(interval_r),
+            interval_count,
+            eps,
+        )
+
+    def _solve_batch(
+        self,
+        evaluate: Callable[[np.ndarray, np.ndarray], np.ndarray],
+        k: int,
+        l: float,
+        r: float,
+        interval_count: int,
+        eps: sp.Float,
+    ) -> List[Solution]:
+        """
+        runge loop over k integrands at once; evaluate(xs, active) returns the
+        values of the active integrands at xs, shape (len(active), len(xs))
+        """
+        if not np.isfinite(l) or not np.isfinite(r):
+            raise ValueError("batch solving requires a finite interval")
+        self._start_budget()
+        eps_f = float(eps)
+        prev = np.full(k, np.nan)
+        values = np.full(k, np.nan)
+        errors = np.full(k, np.inf)
+        counts = np.zeros(k, dtype=np.int64)
+        evaluations = np.zeros(k, dtype=np.int64)
+        active = np.arange(k)
+
+        for i in range(self.max_iterations + 1):
+            if i > 0:
+                reason = self._limit_reached(interval_count * 2)
+                if reason is not None:
+                    logger.warning(f"{reason}; returning best-so-far estimates")
+                    break
+                interval_count *= 2
+            xs, ws = self.nodes_and_weights(l, r, interval_count)
+            ys = evaluate(xs, active)
+            self._evaluations += len(xs) * len(active)
+            evaluations[active] += len(xs)
+
+            prev[active], values[active] = values[active], ys @ ws
+            counts[active] = interval_count
+            finite = np.isfinite(values[active])
+            if not np.all(finite):
+                logger.warning(
+                    f"{np.count_nonzero(~finite)} integrand(s) are not finite on the grid; giving up on them"
+                )
+                active = active[finite]
+            if i > 0:
+                errors[active] = np.abs(values[active] - prev[active]) / (
+                    2**self.PRECISION_ORDER - 1
+                )
+                logger.debug(
+                    f"iteration {i}: {len(active)} active, max error={np.max(errors[active], initial=0)}"
+                )
+                active = active[~(errors[active] < eps_f)]
+            if len(active) == 0:
+                break
+
+        return [
+            Solution(
+                float(values[j]),
+                int(counts[j]),
+                float(errors[j]),
+                converged=bool(errors[j] < eps_f),
+                evaluations=int(evaluations[j]),
+            )
+            for j in range(k)
+        ]
+
+    def solve_box(
+        self, integral: BoxIntegralExpr, interval_count: int, eps: sp.Float = EPS
+    ) -> Solution:
+        """
+        integrates over a box with the tensor product of this solver's float64
+        rule (nodes_and_weights) on every axis; interval_count (per axis) is
+        doubled Runge-style, a tensor rule having the error order of its 1D rule
+        returns a native float Solution (interval_count per axis)
+        """
+        self._start_budget()
+        eps_f = float(eps)
+        value, error = float("nan"), float("inf")
+        converged = False
+        for i in range(self.max_iterations + 1):
+            count = interval_count * 2 if i > 0 else interval_count
+            try:
+                rules = [
+                    self.nodes_and_weights(l, r, count) for l, r in integral.bounds
+                ]
+            except NotImplementedError:
+                raise ValueError(
+                    f"{type(self).__name__} has no float64 rule for box integrals"
+                )
+            points = int(np.prod([len(xs) for xs, _ in rules]))
+            reason = self._box_limit_reached(points)
+            if reason is not None and i == 0:
+                raise ValueError(f"{reason} by the first level ({points} points)")
+            if reason is not None:
+                logger.warning(f"{reason}; returning best-so-far estimate")
+                break
+            interval_count = count
+            prev, value = value, self._box_level(integral.fn, rules)
+            self._evaluations += points
+            if i == 0:
+                continue
+            error = abs(value - prev) / (2**self.PRECISION_ORDER - 1)
+            logger.debug(
+                f"iteration {i}: value={value}, error={error}, {points} points"
+            )
+            if error < eps_f:
+                converged = True
+                break
+            if self._box_unreachable(points, 2 ** len(integral.bounds), error, eps_f):
+                break
+        else:
+            logger.warning(
+                f"no convergence after {self.max_iterations} iterations (error={error}); "
+                "returning best-so-far estimate"
+            )
+        return Solution(
+            value,
+            interval_count,
+            error,
+            converged=converged,
+            evaluations=self._evaluations,
+        )
+
+    def _box_limit_reached(
+        self, points: int, evaluations: int | None = None
+    ) -> str | None:
+        """
+        reason not to compute a level of `points` points (`evaluations` of
+        them new, all by default), if any; levels above BOX_MAX_POINTS are
+        refused unless --max-evals allows them
+        """
+        if self.max_evals is None and points > BOX_MAX_POINTS:
+            return f"a level of {points} points exceeds BOX_MAX_POINTS={BOX_MAX_POINTS}"
+        return self._budget_reason(points if evaluations is None else evaluations)
+
+    def _box_unreachable(
+        self, points: int, growth: int, error: float, eps: float
+    ) -> bool:
+        """
+        True (with a warning) when reaching eps at this rule's order would need
+        a level above the evaluation limit; every doubling costs `growth`
+        times the points of the previous level; never predicted for spectral
+        rules (the per-level limit still applies)
+        """
+        if self.CONVERGES_SPECTRALLY:
+            return False
+        if not (np.isfinite(error) and error > eps > 0):
+            return False
+        levels = math.ceil(math.log2(error / eps) / self.PRECISION_ORDER)
+        needed = points * float(growth) ** levels
+        limit = BOX_MAX_POINTS if self.max_evals is None else self.max_evals
+        if needed <= limit:
+            return False
+        logger.warning(
+            f"eps={eps} needs about {needed:.3g} points with an order "
+            f"{self.PRECISION_ORDER} rule ({growth}x points per doubling), more "
+            f"than the limit of {limit}; use a higher order method (or sobol). "
+            "Returning best-so-far estimate"
+        )
+        return True
+
+    def _box_level(
+        self, fn: MultiFunctionExpr, rules: List[Tuple[np.ndarray, np.ndarray]]
+    ) -> float:
+        """
+        sum of w_x * w_y (* w_z) * f over the tensor grid, evaluated in slabs
+        of x so that at most about BOX_CHUNK_POINTS values are held at a time
+        """
+        (xs, wx), *rest = rules
+        axes = [nodes for nodes, _ in rest]
+        w_rest = reduce(np.multiply.outer, [ws for _, ws in rest]).ravel()
+        rows = max(1, BOX_CHUNK_POINTS // len(w_rest))
+        total = 0.0
+        for start in range(0, len(xs), rows):
+            ys = fn.compute_grid([xs[start : start + rows], *axes])
+            if not np.all(np.isfinite(ys)):
+                raise ValueError(f"{fn} is not finite at some nodes")
+            total += float(
+                wx[start : start + rows] @ (ys.reshape(len(ys), -1) @ w_rest)
+            )
+        return total
+
+    def _merge(self, solutions: List[Solution]) -> Solution:
         return Solution(
             value=sum(s.value for s in solutions),
             interval_count=sum(s.interval_count for s in solutions),
             error_rate=max(s.error_rate for s in solutions),
+            states=[state for s in solutions for state in s.states],
+            converged=all(s.converged for s in solutions),
+            evaluations=sum(s.evaluations for s in solutions),
         )
 
+    def dump_state(
+        self, f_str: str, interval_l: Number, interval_r: Number, solution: Solution
+    ) -> Dict[str, Any]:
+        """
+        serializable snapshot of a solution for a later resume()
+        """
+        return {
+            "function": f_str,
+            "interval": [str(to_sp_float(interval_l)), str(to_sp_float(interval_r))],
+            "solver": list(self.cache_params()),
+            "solution": solution.to_dict(),
+        }
+
+    def load_state(
+        self, obj: Dict[str, Any], f_str: str, interval_l: Number, interval_r: Number
+    ) -> Solution:
+        if obj.get("function") != f_str:
+            raise ValueError(
+                f"saved state is for function {obj.get('function')}, not {f_str}"
+            )
+        interval = [str(to_sp_float(interval_l)), str(to_sp_float(interval_r))]
+        if obj.get("interval") != interval:
+            raise ValueError(
+                f"saved state is for interval {obj.get('interval')}, not {interval}"
+            )
+        if obj.get("solver") != list(self.cache_params()):
+            raise ValueError(
+                f"saved state is for solver {obj.get('solver')}, not {list(self.cache_params())}"
+            )
+        return Solution.from_dict(obj["solution"])
+
+    def resume(
+        self, integral_expr: IntegralExpr, solution: Solution, eps: sp.Float = EPS
+    ) -> Solution:
+        """
+        continues the Runge loop of every (sub)interval of a previous solution
+        of integral_expr from its last level, e.g. to reach a tighter eps;
+        an exact solution (--closed-form, no subdivisions) is returned as is
+        """
+        if not solution.states and solution.interval_count == 0:
+            logger.info("saved solution is exact; nothing to refine")
+            return solution
+        if not solution.states:
+            raise ValueError("solution has no runge state to resume from")
+        self._start_budget()
+        integral_expr = self._finite(integral_expr)
+        solutions: List[Solution] = []
+        for state in solution.states:
+            logger.debug(f"resuming from {state}")
+            segment = integral_expr.view(state.interval_l, state.interval_r)
+            solutions.append(
+                self._runge(
+                    segment, state.interval_count, state.prev_value, state.value, eps
+                )
+            )
+        return self._merge(solutions)
+
     def _solve(
         self, integral_expr: IntegralExpr, interval_count: int, eps: sp.Float = EPS
     ) -> Solution:
@@ -100,7 +795,13 @@ class BaseSolver:
         """
         if not integral_expr.is_convergent():
             # only checks that the interval is not infinite
-            raise ValueError(f"integral {integral_expr} does not converge")
+            if not (
+                self.HANDLES_ENDPOINT_SINGULARITIES and integral_expr.is_improper() == 2
+            ):
+                raise ValueError(f"integral {integral_expr} does not converge")
+            logger.debug(
+                "improper integral with endpoint singularities; convergence is judged by the runge sequence"
+            )
 
         if integral_expr.interval_l == integral_expr.interval_r:
             return Solution(
@@ -109,29 +810,183 @@ class BaseSolver:
                 error_rate=to_sp_float(0),
             )
 
+        if not self.HANDLES_ENDPOINT_SINGULARITIES:
+            integral_expr = self._shift_infinite_bounds(integral_expr)
+
+        evaluations_before = self._evaluations
+        if self.mixed_precision and self.workers < 2 and not self.COMPUTES_IN_FLOAT64:
+            solution = self._runge_mixed(
+                integral_expr, interval_count, eps, evaluations_before
+            )
+            if solution is not None:
+                return solution
+        prev = self.compute(integral_expr, interval_count)
+        self._count(interval_count)
+        return self._runge(
+            integral_expr, interval_count, None, prev, eps, evaluations_before
+        )
+
+    def _float64_level(
+        self, integral_expr: IntegralExpr, interval_count: int
+    ) -> Tuple[float, float]:
+        """
+        float64 estimate at interval_count and its roundoff floor
+        (MIXED_PRECISION_SAFETY ulps of sum |w * f|, which also covers cancellation)
+        """
+        xs, ws = self.nodes_and_weights(
+            float(integral_expr.interval_l),
+            float(integral_expr.interval_r),
+            interval_count,
+        )
+        terms = ws * integral_expr.fn.compute_many(xs)
+        self._evaluations += len(xs)
+        value = float(np.sum(terms))
+        floor = (
+            MIXED_PRECISION_SAFETY
+            * np.finfo(np.float64).eps
+            * float(np.sum(np.abs(terms)))
+        )
+        return value, floor
+
+    def _runge_mixed(
+        self,
+        integral_expr: IntegralExpr,
+        interval_count: int,
+        eps: sp.Float,
+        evaluations_before: int,
+    ) -> Solution | None:
+        """
+        the Runge loop in float64 via nodes_and_weights; once eps is below
+        the roundoff floor of the float64 sums (eps too tight, or cancellation)
+        the last level pair is recomputed with compute() and the exact loop
+        takes over from there
+        returns None, to run the exact loop from the start, if this solver has
+        no float64 rule or f is not finite in float64
+        """
+        try:
+            current, floor = self._float64_level(integral_expr, interval_count)
+        except NotImplementedError:
+            return None
+        if not np.isfinite(current):
+            logger.debug("float64 evaluation is not finite; using exact arithmetic")
+            return None
+        prev: float | None = None
+        error = float("inf")
+        eps_f = float(eps)
+        converged, escalate = False, eps_f < floor
+        for i in range(0 if escalate else self.max_iterations):
+            reason = self._limit_reached(interval_count * 2)
+            if reason is not None:
+                logger.warning(f"{reason}; returning best-so-far estimate")
+                break
+            interval_count *= 2
+            value, floor = self._float64_level(integral_expr, interval_count)
+            if not np.isfinite(value):
+                escalate = True
+                break
+            prev, current = current, value
+            error = abs(current - prev) / (2**self.PRECISION_ORDER - 1)
+            logger.debug(f"iteration {i+1} (float64): value={current}, error={error}")
+            if eps_f < floor:
+                escalate = True
+                break
+            if error < eps_f and self.error_trusted(integral_expr, interval_count):
+                converged = True
+                break
+        else:
+            if not escalate:
+                logger.warning(
+                    f"no convergence after {self.max_iterations} iterations (error={error}); "
+                    "integral may diverge, returning best-so-far estimate"
+                )
+
+        if escalate:
+            logger.debug(
+                f"eps={eps_f} is below the float64 roundoff floor {floor} at "
+                f"{interval_count} subdivisions; recomputing it in full precision"
+            )
+            prev_exact = None
+            if prev is not None:
+                prev_exact = self.compute(integral_expr, interval_count // 2)
+                self._count(interval_count // 2)
+            current_exact = self.compute(integral_expr, interval_count)
+            self._count(interval_count)
+            return self._runge(
+                integral_expr,
+                interval_count,
+                prev_exact,
+                current_exact,
+                eps,
+                evaluations_before,
+            )
+        return self._solution(
+            integral_expr,
+            interval_count,
+            None if prev is None else to_sp_float(prev),
+            to_sp_float(current),
+            to_sp_float(error),
+            converged,
+            self._evaluations - evaluations_before,
+        )
+
+    def _shift_infinite_bounds(self, integral_expr: IntegralExpr) -> IntegralExpr:
         if abs(integral_expr.fn.limit(integral_expr.interval_l, dir="+")) == sp.oo:
-            integral_expr = IntegralExpr(
-                interval_l=integral_expr.interval_l + INF_EPS,
-                interval_r=integral_expr.interval_r,
-                fn=integral_expr.fn,
+            integral_expr = integral_expr.view(
+                integral_expr.interval_l + INF_EPS, integral_expr.interval_r
             )
             logger.warning(
                 f"left limit is infinite; interval_l={integral_expr.interval_l}"
             )
         if abs(integral_expr.fn.limit(integral_expr.interval_r, dir="-")) == sp.oo:
-            integral_expr = IntegralExpr(
-                interval_l=integral_expr.interval_l,
-                interval_r=integral_expr.interval_r - INF_EPS,
-                fn=integral_expr.fn,
+            integral_expr = integral_expr.view(
+                integral_expr.interval_l, integral_expr.interval_r - INF_EPS
             )
             logger.warning(
                 f"right limit is infinite; interval_r={integral_expr.interval_r}"
             )
+        return integral_expr
 
-        prev = self.compute(integral_expr, interval_count)
-        for i in range(self.MAX_ITERATIONS):
+    def _runge(
+        self,
+        integral_expr: IntegralExpr,
+        interval_count: int,
+        prev: sp.Float | None,
+        current: sp.Float,
+        eps: sp.Float,
+        evaluations_before: int | None = None,
+    ) -> Solution:
+        """
+        Runge doubling loop starting from the estimate `current` at interval_count
+        (and `prev` at interval_count / 2, if known); stops early, returning a
+        non-converged solution, when a limit is hit
+        """
+        if evaluations_before is None:
+            evaluations_before = self._evaluations
+        error: sp.Float = to_sp_float("inf")
+        if prev is not None:
+            error = abs(current - prev) / (2**self.PRECISION_ORDER - 1)
+            if error < eps and self.error_trusted(integral_expr, interval_count):
+                return self._solution(
+                    integral_expr,
+                    interval_count,
+                    prev,
+                    current,
+                    error,
+                    True,
+                    self._evaluations - evaluations_before,
+                )
+        if self.workers > 1:
+            return self._runge_speculative(
+                integral_expr, interval_count, prev, current, eps, evaluations_before
+            )
+        for i in range(self.max_iterations):
+            reason = self._limit_reached(interval_count * 2)
+            if reason is not None:
+                logger.warning(f"{reason}; returning best-so-far estimate")
+                break
             interval_count *= 2
-            current = self.compute(integral_expr, interval_count)
+            prev, current = current, self.compute(integral_expr, interval_count)
+            self._count(interval_count)
             error = abs(current - prev) / (2**self.PRECISION_ORDER - 1)
             logger.debug(f"iteration {i+1}: value={current}, error={error}")
             # if error > RUNGE_ERROR_THRESHOLD:
@@ -139,11 +994,134 @@ class BaseSolver:
             #         f"error={error} > RUNGE_ERROR_THRESHOLD={RUNGE_ERROR_THRESHOLD}; assuming divergent "
             #     )
             #     break
-            if error < eps:
-                return Solution(
-                    current,
+            if error < eps and self.error_trusted(integral_expr, interval_count):
+                return self._solution(
+                    integral_expr,
                     interval_count,
+                    prev,
+                    current,
                     error,
+                    True,
+                    self._evaluations - evaluations_before,
+                )
+        else:
+            logger.warning(
+                f"no convergence after {self.max_iterations} iterations (error={error}); "
+                "integral may diverge, returning best-so-far estimate"
+            )
+        return self._solution(
+            integral_expr,
+            interval_count,
+            prev,
+            current,
+            error,
+            False,
+            self._evaluations - evaluations_before,
+        )
+
+    def _runge_speculative(
+        self,
+        integral_expr: IntegralExpr,
+        interval_count: int,
+        prev: sp.Float | None,
+        current: sp.Float,
+        eps: sp.Float,
+        evaluations_before: int,
+    ) -> Solution:
+        """
+        _runge with the next self.workers levels computed concurrently in
+        worker processes; levels are consumed in order, the first one meeting
+        eps wins and the levels still in flight are terminated
+        """
+        error: sp.Float = to_sp_float("inf")
+        converged = False
+        reason: str | None = None
+        levels: deque[Tuple[int, Any]] = deque()
+        next_count, submitted, reserved = interval_count, 0, 0
+        start_method = (
+            "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        )
+        # leaving the with block terminates the pool, cancelling unused levels
+        with multiprocessing.get_context(start_method).Pool(self.workers) as pool:
+            while True:
+                while len(levels) < self.workers and submitted < self.max_iterations:
+                    reason = self._limit_reached(next_count * 2, reserved)
+                    if reason is not None:
+                        break
+                    next_count *= 2
+                    submitted += 1
+                    reserved += self.evaluations_for(next_count)
+                    levels.append(
+                        (
+                            next_count,
+                            pool.apply_async(self.compute, (integral_expr, next_count)),
+                        )
+                    )
+                if not levels:
+                    break
+                count, pending = levels.popleft()
+                timeout = (
+                    None
+                    if self._deadline is None
+                    else max(0.0, self._deadline - time.monotonic())
+                )
+                try:
+                    value = pending.get(timeout)
+                except multiprocessing.TimeoutError:
+                    reason = f"time limit of {self.time_limit}s reached"
+                    break
+                reserved -= self.evaluations_for(count)
+                interval_count, prev, current = count, current, value
+                self._count(count)
+                error = abs(current - prev) / (2**self.PRECISION_ORDER - 1)
+                logger.debug(
+                    f"level {count} (speculative): value={current}, error={error}"
+                )
+                if error < eps and self.error_trusted(integral_expr, interval_count):
+                    converged = True
+                    break
+        if levels:
+            logger.debug(f"cancelled {len(levels)} speculative level(s)")
+        if not converged:
+            if reason is not None:
+                logger.warning(f"{reason}; returning best-so-far estimate")
+            else:
+                logger.warning(
+                    f"no convergence after {self.max_iterations} iterations (error={error}); "
+                    "integral may diverge, returning best-so-far estimate"
                 )
-            prev = current
-        raise ValueError("integral diverges")
+        return self._solution(
+            integral_expr,
+            interval_count,
+            prev,
+            current,
+            error,
+            converged,
+            self._evaluations - evaluations_before,
+        )
+
+    def _solution(
+        self,
+        integral_expr: IntegralExpr,
+        interval_count: int,
+        prev: sp.Float | None,
+        current: sp.Float,
+        error: sp.Float,
+        converged: bool,
+        evaluations: int,
+    ) -> Solution:
+        state = RungeState(
+            integral_expr.interval_l,
+            integral_expr.interval_r,
+            interval_count,
+            current,
+            prev,
+        )
+        return Solution(
+            current,
+            interval_count,
+            error,
+            [state],
+            converged=converged,
+            evaluations=evaluations,
+        )
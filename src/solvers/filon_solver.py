@@ -0,0 +1,141 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import sympy as sp  # type: ignore
+
+from logger import GlobalLogger
+from solvers.base_solver import BaseSolver
+from utils.integrals import FunctionExpr, IntegralExpr
+from utils.math import compile_kernel, split_oscillatory
+from utils.validation import to_sp_float
+
+logger = GlobalLogger()
+
+# (g kernel, "sin"|"cos", w > 0, phi, sign)
+type CompiledTerm = Tuple[Callable[[Any], Any], str, float, float, float]
+
+
+def filon_coefficients(theta: float) -> Tuple[float, float, float]:
+    """
+    alpha, beta, gamma of the Filon-Simpson rule for theta = w * h
+    (taylor series for small theta, where the closed forms cancel)
+    """
+    if abs(theta) < 1 / 6:
+        t2 = theta * theta
+        alpha = theta * t2 * (2 / 45 - t2 * (2 / 315 - t2 * 2 / 4725))
+        beta = 2 / 3 + t2 * (2 / 15 - t2 * (4 / 105 - t2 * 2 / 567))
+        gamma = 4 / 3 - t2 * (2 / 15 - t2 * (1 / 210 - t2 / 11340))
+        return alpha, beta, gamma
+    s, c = np.sin(theta), np.cos(theta)
+    t3 = theta**3
+    alpha = (theta * theta + theta * s * c - 2 * s * s) / t3
+    beta = 2 * (theta * (1 + c * c) - 2 * s * c) / t3
+    gamma = 4 * (s - theta * c) / t3
+    return alpha, beta, gamma
+
+
+class FilonSolver(BaseSolver):
+    """
+    Filon-Simpson quadrature for f = sum g_k(x) * sin|cos(w_k*x + phi_k) + rest:
+    the oscillatory factors are integrated exactly against a piecewise
+    quadratic interpolant of g_k, so the step only has to resolve g_k and the
+    cost does not grow with w; rest (and f without an oscillatory factor)
+    falls back to Simpson on the same nodes; float64
+    """
+
+    # the error is O(h^4) only once w * h is small; before that it is not
+    # monotone in h, so |I_2n - I_n| is used as is (conservative) and is not
+    # trusted at all while w * h > 1 (see error_trusted)
+    PRECISION_ORDER = 1
+    COMPUTES_IN_FLOAT64 = True
+
+    # the decomposition of the last function, compiled
+    _split: Tuple[FunctionExpr, List[CompiledTerm], FunctionExpr] | None = None
+
+    def _compiled_split(
+        self, fn: FunctionExpr
+    ) -> Tuple[List[CompiledTerm], FunctionExpr]:
+        if self._split is not None and self._split[0] is fn:
+            return self._split[1], self._split[2]
+        terms, rest = split_oscillatory(fn.expr, fn.symbol)
+        if not terms:
+            logger.warning(
+                f"no sin/cos(w*x + phi) factor found in {fn.expr}; using simpson's rule"
+            )
+        # g must be finite on the nodes; where it is not (e.g. sin(50*x) / x at
+        # 0) the term can still have a finite limit, which rest patches
+        points = [float(s) for s in fn.singularities]
+        if fn.interval is not None:
+            points += [float(x) for x in fn.interval]
+        compiled: List[CompiledTerm] = []
+        for g, kind, w, phi in terms:
+            g_kernel = compile_kernel(g, fn.symbol, optimize=True)
+            if points and not np.all(np.isfinite(g_kernel(np.array(points)))):
+                trig = sp.sin if kind == "sin" else sp.cos
+                logger.debug(f"{g} is not finite on the interval; adding to rest")
+                rest += g * trig(w * fn.symbol + phi)
+                continue
+            logger.debug(f"oscillatory term: ({g}) * {kind}({w}*x + {phi})")
+            sign = 1.0
+            if w < 0:
+                # cos(-a) = cos(a), sin(-a) = -sin(a)
+                w, phi = -w, -phi
+                sign = -1.0 if kind == "sin" else 1.0
+            compiled.append((g_kernel, kind, w, phi, sign))
+        # rest has its own fixable singularities (and limits), not those of f
+        rest_fn = FunctionExpr(f=sp.Lambda(fn.symbol, rest), interval=fn.interval)
+        self._split = (fn, compiled, rest_fn)
+        return compiled, rest_fn
+
+    def error_trusted(self, integral_expr: IntegralExpr, interval_count: int) -> bool:
+        """
+        two levels that do not resolve an oscillation yet can agree by chance
+        (e.g. sin(x) * sin(200*x) stalls near 8e-8 while w * h > 1)
+        """
+        terms, _ = self._compiled_split(integral_expr.fn)
+        if not terms:
+            return True
+        h = float(integral_expr.interval_r - integral_expr.interval_l) / interval_count
+        return max(w for _, _, w, _, _ in terms) * h <= 1
+
+    def compute(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
+        if interval_count % 2 != 0:
+            raise ValueError("interval_count must be even")
+        terms, rest_fn = self._compiled_split(integral_expr.fn)
+        l, r = float(integral_expr.interval_l), float(integral_expr.interval_r)
+        h = (r - l) / interval_count
+        xs = np.linspace(l, r, interval_count + 1)
+
+        # simpson for the non-oscillatory part
+        ws = np.full(interval_count + 1, 2 * h / 3)
+        ws[1::2] = 4 * h / 3
+        ws[0] = ws[-1] = h / 3
+        total = float(np.dot(ws, rest_fn.compute_many(xs)))
+
+        for g_kernel, kind, w, phi, sign in terms:
+            gs = g_kernel(xs)
+            if not np.all(np.isfinite(gs)):
+                raise ValueError(
+                    "the non-oscillatory factor is not finite on the interval; "
+                    "use another method"
+                )
+            us = w * xs + phi
+            alpha, beta, gamma = filon_coefficients(w * h)
+            if kind == "cos":
+                ts = gs * np.cos(us)
+                ends = gs[-1] * np.sin(us[-1]) - gs[0] * np.sin(us[0])
+            else:
+                ts = gs * np.sin(us)
+                ends = gs[0] * np.cos(us[0]) - gs[-1] * np.cos(us[-1])
+            even = np.sum(ts[0::2]) - (ts[0] + ts[-1]) / 2
+            odd = np.sum(ts[1::2])
+            total += sign * h * (alpha * ends + beta * even + gamma * odd)
+
+        if not np.isfinite(total):
+            raise ValueError(f"{integral_expr.fn} is not finite at some nodes")
+        return to_sp_float(total)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super().__getstate__()
+        state.pop("_split", None)
+        return state
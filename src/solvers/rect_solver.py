@@ -1,10 +1,13 @@
 import enum
+from typing import Tuple
 
+import numpy as np
 import sympy as sp  # type: ignore
 
 from logger import GlobalLogger
 from solvers.base_solver import BaseSolver
 from utils.integrals import IntegralExpr
+from utils.tabulated import RectAccumulator
 from utils.validation import to_sp_float
 
 logger = GlobalLogger()
@@ -25,17 +28,49 @@ class RectSolver(BaseSolver):
         h = self.get_h(
             integral_expr.interval_l, integral_expr.interval_r, interval_count
         )
-        if self.strategy == RectStrategy.LEFT:
-            x = integral_expr.interval_l
-        elif self.strategy == RectStrategy.RIGHT:
-            x = integral_expr.interval_l + h
-        elif self.strategy == RectStrategy.CENTER:
-            x = integral_expr.interval_l + h / 2
+        x = integral_expr.interval_l + h * self._offset()
         for i in range(interval_count):
-            x += h
             y = integral_expr.fn.compute(x)
             ans += h * y
+            x += h
         return ans
 
+    def _offset(self) -> float:
+        """
+        node position inside each subinterval, in units of h
+        """
+        if self.strategy == RectStrategy.RIGHT:
+            return 1.0
+        if self.strategy == RectStrategy.CENTER:
+            return 0.5
+        return 0.0
+
+    def sample_accumulator(self) -> RectAccumulator:
+        if self.strategy == RectStrategy.CENTER:
+            raise ValueError(
+                "center rect strategy needs midpoint values, which samples do not have"
+            )
+        return RectAccumulator(right=self.strategy == RectStrategy.RIGHT)
+
+    def nodes_and_weights(
+        self, interval_l: float, interval_r: float, interval_count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        h = (interval_r - interval_l) / interval_count
+        xs = interval_l + h * (np.arange(interval_count) + self._offset())
+        return xs, np.full(interval_count, h)
+
+    def evaluations_for(self, interval_count: int) -> int:
+        return interval_count
+
+    def error_bound(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
+        l, r = integral_expr.interval_l, integral_expr.interval_r
+        h = self.get_h(l, r, interval_count)
+        if self.strategy == RectStrategy.CENTER:
+            return (r - l) * h**2 / 24 * integral_expr.fn.max_abs_derivative(2, l, r)
+        return (r - l) * h / 2 * integral_expr.fn.max_abs_derivative(1, l, r)
+
+    def cache_params(self) -> Tuple[str, ...]:
+        return (*super().cache_params(), self.strategy.value)
+
     def set_strategy(self, strategy: RectStrategy) -> None:
         self.strategy = strategy
@@ -1,10 +1,13 @@
-from typing import List
+from typing import Tuple
 
+import numpy as np
 import sympy as sp  # type: ignore
 
 from logger import GlobalLogger
 from solvers.base_solver import BaseSolver
 from utils.integrals import IntegralExpr
+from utils.tabulated import SimpsonAccumulator
+from utils.validation import to_sp_float
 
 logger = GlobalLogger()
 
@@ -12,32 +15,40 @@ logger = GlobalLogger()
 class SimpsonSolver(BaseSolver):
     PRECISION_ORDER = 4  # k param
 
-    def _generate_xs(
-        self, interval_l: sp.Float, interval_r: sp.Float, interval_count: int
-    ) -> List[sp.Float]:
-        h = self.get_h(interval_l, interval_r, interval_count)
-        ans: List[sp.Float] = []
-        for i in range(interval_count):
-            ans.append(interval_l + h * i)
-        ans.append(interval_r)
-        return ans
-
     def compute(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
-        h = self.get_h(
-            integral_expr.interval_l, integral_expr.interval_r, interval_count
-        )
-        f, interval_l = integral_expr.fn.compute, integral_expr.interval_l
-        xs = self._generate_xs(interval_l, integral_expr.interval_r, interval_count)
-        if len(xs) % 2 == 0:
+        if interval_count % 2 != 0:
             raise ValueError("interval_count must be even")
-        x0 = xs[0]
-        odd_xs = xs[1::2]
-        even_xs = xs[2:-1:2]
-        xn = xs[-1]
-
-        y0 = f(x0)
-        odd_ys = [f(x) for x in odd_xs]
-        even_ys = [f(x) for x in even_xs]
-        yn = f(xn)
-
-        return h / 3 * (y0 + 4 * sum(odd_ys) + 2 * sum(even_ys) + yn)
+        interval_l, interval_r = integral_expr.interval_l, integral_expr.interval_r
+        h = self.get_h(interval_l, interval_r, interval_count)
+        f = integral_expr.fn.compute
+
+        # nodes are generated on the fly from strided index ranges and summed
+        # as they go, so memory does not grow with interval_count
+        odd_sum: sp.Float = to_sp_float(0)
+        for i in range(1, interval_count, 2):
+            odd_sum += f(interval_l + h * i)
+        even_sum: sp.Float = to_sp_float(0)
+        for i in range(2, interval_count - 1, 2):
+            even_sum += f(interval_l + h * i)
+
+        return h / 3 * (f(interval_l) + 4 * odd_sum + 2 * even_sum + f(interval_r))
+
+    def sample_accumulator(self) -> SimpsonAccumulator:
+        return SimpsonAccumulator()
+
+    def nodes_and_weights(
+        self, interval_l: float, interval_r: float, interval_count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if interval_count % 2 != 0:
+            raise ValueError("interval_count must be even")
+        h = (interval_r - interval_l) / interval_count
+        xs = np.linspace(interval_l, interval_r, interval_count + 1)
+        ws = np.full(interval_count + 1, 2 * h / 3)
+        ws[1::2] = 4 * h / 3
+        ws[0] = ws[-1] = h / 3
+        return xs, ws
+
+    def error_bound(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
+        l, r = integral_expr.interval_l, integral_expr.interval_r
+        h = self.get_h(l, r, interval_count)
+        return (r - l) * h**4 / 180 * integral_expr.fn.max_abs_derivative(4, l, r)
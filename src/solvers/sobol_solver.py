@@ -0,0 +1,119 @@
+from typing import Tuple
+
+import numpy as np
+import sympy as sp  # type: ignore
+from scipy.stats import qmc  # type: ignore
+
+from config import BOX_CHUNK_POINTS, EPS, QMC_SEED
+from logger import GlobalLogger
+from solvers.base_solver import BaseSolver, Solution
+from utils.integrals import BoxIntegralExpr, IntegralExpr
+from utils.validation import to_sp_float
+
+logger = GlobalLogger()
+
+
+class SobolSolver(BaseSolver):
+    """
+    quasi-Monte Carlo: the mean of f over the first interval_count points of
+    a scrambled Sobol sequence (scipy.stats.qmc), times the volume; the cost
+    of a level does not grow with the dimension, unlike tensor rules, at the
+    price of a slower (about 1/n) convergence; interval_count is rounded up
+    to a power of 2, where the sequence is balanced; float64
+    """
+
+    PRECISION_ORDER = 1  # the error is about O(1/n), up to log factors
+    COMPUTES_IN_FLOAT64 = True
+    seed: int = QMC_SEED
+
+    def evaluations_for(self, interval_count: int) -> int:
+        return self._point_count(interval_count)
+
+    def _sequence(self, dimensions: int) -> qmc.Sobol:
+        return qmc.Sobol(dimensions, scramble=True, rng=self.seed)
+
+    def _point_count(self, interval_count: int) -> int:
+        if interval_count < 1:
+            raise ValueError("interval_count must be greater than 0")
+        points = 1 << (interval_count - 1).bit_length()
+        if points != interval_count:
+            logger.debug(f"sobol: {interval_count} points rounded up to {points}")
+        return points
+
+    def compute(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
+        xs, ws = self.nodes_and_weights(
+            float(integral_expr.interval_l),
+            float(integral_expr.interval_r),
+            interval_count,
+        )
+        ys = integral_expr.fn.compute_many(xs)
+        if not np.all(np.isfinite(ys)):
+            raise ValueError(f"{integral_expr.fn} is not finite at some nodes")
+        return to_sp_float(float(np.dot(ws, ys)))
+
+    def nodes_and_weights(
+        self, interval_l: float, interval_r: float, interval_count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        points = self._point_count(interval_count)
+        ts = self._sequence(1).random(points)[:, 0]
+        xs = interval_l + (interval_r - interval_l) * ts
+        return xs, np.full(points, (interval_r - interval_l) / points)
+
+    def solve_box(
+        self, integral: BoxIntegralExpr, interval_count: int, eps: sp.Float = EPS
+    ) -> Solution:
+        """
+        the sequence is extensible: the first n points of level 2n are the
+        points of level n, so every doubling only evaluates the n new points
+        and adds them to a running sum
+        """
+        interval_count = self._point_count(interval_count)
+        self._start_budget()
+        eps_f = float(eps)
+        sequence = self._sequence(integral.fn.dimensions)
+        lows = np.array([l for l, _ in integral.bounds])
+        widths = np.array([r - l for l, r in integral.bounds])
+        volume = integral.volume
+
+        total, count = 0.0, 0
+        value, error = float("nan"), float("inf")
+        converged = False
+        for i in range(self.max_iterations + 1):
+            new = interval_count if i == 0 else count
+            reason = self._box_limit_reached(count + new, new)
+            if reason is not None and i == 0:
+                raise ValueError(f"{reason} by the first level ({new} points)")
+            if reason is not None:
+                logger.warning(f"{reason}; returning best-so-far estimate")
+                break
+            for start in range(0, new, BOX_CHUNK_POINTS):
+                points = lows + widths * sequence.random(
+                    min(BOX_CHUNK_POINTS, new - start)
+                )
+                ys = integral.fn.compute_points(points)
+                if not np.all(np.isfinite(ys)):
+                    raise ValueError(f"{integral.fn} is not finite at some points")
+                total += float(np.sum(ys))
+            count += new
+            self._evaluations += new
+            prev, value = value, volume * total / count
+            if i == 0:
+                continue
+            error = abs(value - prev) / (2**self.PRECISION_ORDER - 1)
+            logger.debug(f"iteration {i}: value={value}, error={error}, {count} points")
+            if error < eps_f:
+                converged = True
+                break
+            if self._box_unreachable(count, 2, error, eps_f):
+                break
+        else:
+            logger.warning(
+                f"no convergence after {self.max_iterations} iterations (error={error}); "
+                "returning best-so-far estimate"
+            )
+        return Solution(
+            value, count, error, converged=converged, evaluations=self._evaluations
+        )
+
+    def cache_params(self) -> Tuple[str, ...]:
+        return (*super().cache_params(), str(self.seed))
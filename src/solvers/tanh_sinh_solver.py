@@ -0,0 +1,71 @@
+from typing import Tuple
+
+import numpy as np
+import sympy as sp  # type: ignore
+from mpmath import mp  # type: ignore
+
+from logger import GlobalLogger
+from solvers.base_solver import BaseSolver
+from utils.integrals import IntegralExpr
+from utils.validation import to_sp_float
+
+logger = GlobalLogger()
+
+
+class TanhSinhSolver(BaseSolver):
+    """
+    double-exponential quadrature: x = (a+b)/2 + (b-a)/2 * tanh(pi/2 * sinh(t)),
+    trapezoid rule in t on [-T, T] with step h = T / interval_count;
+    nodes never touch the endpoints, so integrable endpoint singularities
+    need no INF_EPS shift
+    """
+
+    PRECISION_ORDER = 1  # convergence is exponential; |I_2n - I_n| is conservative
+    HANDLES_ENDPOINT_SINGULARITIES = True
+    CONVERGES_SPECTRALLY = True
+    T = 3.5  # weights at |t| = T are ~1e-22 of the central one
+
+    def evaluations_for(self, interval_count: int) -> int:
+        return 2 * interval_count + 1
+
+    def compute(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
+        f = integral_expr.fn.compute
+        a, b = mp.mpf(integral_expr.interval_l), mp.mpf(integral_expr.interval_r)
+        half = (b - a) / 2
+        h = mp.mpf(self.T) / interval_count
+
+        ans = half * mp.pi / 2 * mp.mpf(f(to_sp_float((a + b) / 2)))
+        for k in range(1, interval_count + 1):
+            t = k * h
+            u = mp.pi / 2 * mp.sinh(t)
+            weight = half * mp.pi / 2 * mp.cosh(t) / mp.cosh(u) ** 2
+            # distance to the endpoints, computed directly to avoid cancellation
+            d = (b - a) / (mp.exp(2 * u) + 1)
+            for x in (a + d, b - d):
+                if not a < x < b:
+                    continue
+                try:
+                    y = f(to_sp_float(x))
+                except Exception as e:
+                    logger.debug(f"skipping node x={x}: {e}")
+                    continue
+                if not y.is_finite:
+                    logger.debug(f"skipping node x={x}: f={y}")
+                    continue
+                ans += weight * mp.mpf(y)
+        return to_sp_float(ans * h)
+
+    def nodes_and_weights(
+        self, interval_l: float, interval_r: float, interval_count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        a, b = interval_l, interval_r
+        h = self.T / interval_count
+        t = h * np.arange(1, interval_count + 1)
+        u = np.pi / 2 * np.sinh(t)
+        d = (b - a) / (np.exp(2 * u) + 1)
+        w = h * (b - a) / 2 * np.pi / 2 * np.cosh(t) / np.cosh(u) ** 2
+        xs = np.concatenate(([(a + b) / 2], a + d, b - d))
+        ws = np.concatenate(([h * (b - a) / 2 * np.pi / 2], w, w))
+        # float64 nodes that rounded onto a bound are dropped (negligible weight)
+        inside = (xs > a) & (xs < b)
+        return xs[inside], ws[inside]
@@ -1,8 +1,12 @@
+from typing import Tuple
+
+import numpy as np
 import sympy as sp  # type: ignore
 
 from logger import GlobalLogger
 from solvers.base_solver import BaseSolver
 from utils.integrals import IntegralExpr
+from utils.tabulated import TrapAccumulator
 from utils.validation import to_sp_float
 
 logger = GlobalLogger()
@@ -21,3 +25,23 @@ class TrapSolver(BaseSolver):
             a, b = interval_l + h * i, interval_l + h * (i + 1)
             ans += to_sp_float("0.5") * (f(a) + f(b)) * h
         return ans
+
+    def sample_accumulator(self) -> TrapAccumulator:
+        return TrapAccumulator()
+
+    def nodes_and_weights(
+        self, interval_l: float, interval_r: float, interval_count: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        h = (interval_r - interval_l) / interval_count
+        xs = np.linspace(interval_l, interval_r, interval_count + 1)
+        ws = np.full(interval_count + 1, h)
+        ws[0] = ws[-1] = h / 2
+        return xs, ws
+
+    def evaluations_for(self, interval_count: int) -> int:
+        return 2 * interval_count
+
+    def error_bound(self, integral_expr: IntegralExpr, interval_count: int) -> sp.Float:
+        l, r = integral_expr.interval_l, integral_expr.interval_r
+        h = self.get_h(l, r, interval_count)
+        return (r - l) * h**2 / 12 * integral_expr.fn.max_abs_derivative(2, l, r)
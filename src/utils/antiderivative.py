@@ -0,0 +1,178 @@
+from typing import List, Tuple
+
+import numpy as np
+from numpy.polynomial import chebyshev as cheb
+
+from config import ANTIDERIVATIVE_DEGREE, ANTIDERIVATIVE_MAX_PIECES, EPS
+from logger import GlobalLogger
+from solvers.base_solver import Solution
+from utils.integrals import FunctionExpr
+from utils.math import Number
+
+logger = GlobalLogger()
+
+
+class AntiderivativeIndex:
+    """
+    piecewise Chebyshev surrogate of F(x) = integral of fn from interval_l to x,
+    built once over a bounding interval so that any sub-interval [a, b] is
+    answered as F(b) - F(a) in O(log pieces), with an error bound
+
+    pieces are bisected until the tail coefficients of the degree-d interpolant
+    of f are below eps scaled by the piece's share of the interval, so the
+    bounds of all pieces add up to (at most) about eps
+    """
+
+    fn: FunctionExpr
+    interval_l: float
+    interval_r: float
+    eps: float
+    degree: int
+    evaluations: int
+
+    edges: np.ndarray  # (pieces + 1,) sorted breakpoints
+    coefs: np.ndarray  # (pieces, degree + 2) antiderivative on [-1, 1], per piece
+    cumulative: np.ndarray  # (pieces + 1,) F at each edge
+    errors: np.ndarray  # (pieces + 1,) prefix sums of per-piece error bounds
+
+    def __init__(
+        self,
+        fn: FunctionExpr,
+        interval_l: Number,
+        interval_r: Number,
+        eps: Number = EPS,
+        degree: int = ANTIDERIVATIVE_DEGREE,
+        max_pieces: int = ANTIDERIVATIVE_MAX_PIECES,
+    ) -> None:
+        l, r = float(interval_l), float(interval_r)
+        if not (np.isfinite(l) and np.isfinite(r)) or not l < r:
+            raise ValueError(
+                f"antiderivative index needs a finite interval, got [{l}, {r}]"
+            )
+        inside = {s for s in fn.inf_singularities if l <= s <= r}
+        if inside:
+            raise ValueError(f"{fn} has singularities {inside} in [{l}, {r}]")
+        self.fn = fn
+        self.interval_l, self.interval_r = l, r
+        self.eps = float(eps)
+        self.degree = degree
+        self.evaluations = 0
+        self._build(self.eps, max_pieces)
+
+    def _fit(self, a: float, b: float) -> Tuple[np.ndarray, float]:
+        """
+        chebyshev coefficients of f on [a, b] and their truncation estimate
+        (sup norm of the interpolation error)
+        """
+        t = cheb.chebpts2(self.degree + 1)
+        ys = self.fn.compute_many((a + b) / 2 + (b - a) / 2 * t)
+        self.evaluations += len(t)
+        if not np.all(np.isfinite(ys)):
+            raise ValueError(f"{self.fn} is not finite on [{a}, {b}]")
+        c = cheb.chebfit(t, ys, self.degree)
+        return c, float(np.abs(c[-1]) + np.abs(c[-2]))
+
+    def _build(self, eps: float, max_pieces: int) -> None:
+        l, r = self.interval_l, self.interval_r
+        # (a, b) stack, left-most piece on top, so accepted pieces come out sorted
+        stack: List[Tuple[float, float]] = [(l, r)]
+        pieces: List[Tuple[float, float, np.ndarray, float]] = []
+        while stack:
+            a, b = stack.pop()
+            c, tail = self._fit(a, b)
+            # integral error over [a, b] is at most (b - a) * sup error
+            bound = (b - a) * tail
+            if (
+                bound > eps * (b - a) / (r - l)
+                and len(pieces) + len(stack) + 2 <= max_pieces
+            ):
+                m = (a + b) / 2
+                stack.append((m, b))
+                stack.append((a, m))
+                continue
+            pieces.append((a, b, c, bound))
+
+        self.edges = np.array([p[0] for p in pieces] + [r])
+        coefs = np.zeros((len(pieces), self.degree + 2))
+        cumulative = np.zeros(len(pieces) + 1)
+        errors = np.zeros(len(pieces) + 1)
+        for i, (a, b, c, bound) in enumerate(pieces):
+            half = (b - a) / 2
+            # F on the piece is F(a) + half * (C(t) - C(-1)), t in [-1, 1]
+            coefs[i] = cheb.chebint(c, lbnd=-1) * half
+            cumulative[i + 1] = cumulative[i] + cheb.chebval(1.0, coefs[i])
+            errors[i + 1] = errors[i] + bound
+        self.coefs, self.cumulative, self.errors = coefs, cumulative, errors
+        if errors[-1] > eps:
+            logger.warning(
+                f"antiderivative index hit {max_pieces} pieces; error bound {errors[-1]} > eps={eps}"
+            )
+        logger.debug(
+            f"antiderivative index of {self.fn.expr}: {len(pieces)} pieces, "
+            f"{self.evaluations} evaluations, error bound {errors[-1]}"
+        )
+
+    def __len__(self) -> int:
+        return len(self.coefs)
+
+    def _piece(self, xs: np.ndarray) -> np.ndarray:
+        return np.clip(
+            np.searchsorted(self.edges, xs, side="right") - 1, 0, len(self) - 1
+        )
+
+    def antiderivative(self, xs: np.ndarray) -> np.ndarray:
+        """
+        F(x) for every x (vectorized, O(log pieces) each)
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        if np.any((xs < self.interval_l) | (xs > self.interval_r)):
+            raise ValueError(
+                f"query outside of the indexed interval [{self.interval_l}, {self.interval_r}]"
+            )
+        i = self._piece(xs)
+        a, b = self.edges[i], self.edges[i + 1]
+        t = (2 * xs - a - b) / (b - a)
+        # clenshaw over all queries at once, one coefficient column at a time
+        b1 = np.zeros_like(t)
+        b2 = np.zeros_like(t)
+        for k in range(self.coefs.shape[1] - 1, 0, -1):
+            b1, b2 = self.coefs[i, k] + 2 * t * b1 - b2, b1
+        return np.asarray(
+            self.cumulative[i] + self.coefs[i, 0] + t * b1 - b2, dtype=np.float64
+        )
+
+    def integrate_many(
+        self, ls: np.ndarray, rs: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        values and error bounds of the integrals over [ls[k], rs[k]]
+        """
+        ls = np.asarray(ls, dtype=np.float64)
+        rs = np.asarray(rs, dtype=np.float64)
+        values = self.antiderivative(rs) - self.antiderivative(ls)
+        lo = np.minimum(ls, rs)
+        hi = np.maximum(ls, rs)
+        # every piece overlapping the query contributes its whole bound
+        bounds = self.errors[self._piece(hi) + 1] - self.errors[self._piece(lo)]
+        return values, bounds
+
+    def integrate(self, interval_l: Number, interval_r: Number) -> Solution:
+        values, bounds = self.integrate_many(
+            np.array([float(interval_l)]), np.array([float(interval_r)])
+        )
+        return Solution(
+            float(values[0]),
+            len(self),
+            float(bounds[0]),
+            converged=bool(bounds[0] <= self.eps),
+            evaluations=0,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"AntiderivativeIndex({self.fn.expr}, [{self.interval_l}, {self.interval_r}], "
+            f"pieces={len(self)}, error_bound={self.errors[-1]})"
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
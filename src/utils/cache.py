@@ -0,0 +1,93 @@
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from config import CACHE_SIZE
+from logger import GlobalLogger
+
+logger = GlobalLogger()
+
+type CacheKey = Tuple[str, ...]
+
+
+class SolutionCache:
+    """
+    memoizes serialized solutions (dicts, see Solution.to_dict) by a
+    normalized key: in-memory LRU in front of an optional sqlite file
+    """
+
+    max_size: int
+    path: str | None
+    hits: int
+    misses: int
+
+    _lru: "OrderedDict[str, Dict[str, Any]]"
+    _db: sqlite3.Connection | None = None
+
+    def __init__(self, max_size: int = CACHE_SIZE, path: str | None = None) -> None:
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, payload TEXT NOT NULL)"
+            )
+            self._db.commit()
+            logger.debug(f"using persistent solution cache {path}")
+
+    @staticmethod
+    def _serialize_key(key: CacheKey) -> str:
+        return json.dumps(key, separators=(",", ":"))
+
+    def get(self, key: CacheKey) -> Dict[str, Any] | None:
+        skey = self._serialize_key(key)
+        payload = self._lru.get(skey)
+        if payload is not None:
+            self._lru.move_to_end(skey)
+            self.hits += 1
+            return payload
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT payload FROM solutions WHERE key = ?", (skey,)
+            ).fetchone()
+            if row is not None:
+                stored: Dict[str, Any] = json.loads(row[0])
+                self._remember(skey, stored)
+                self.hits += 1
+                return stored
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, payload: Dict[str, Any]) -> None:
+        skey = self._serialize_key(key)
+        self._remember(skey, payload)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO solutions (key, payload) VALUES (?, ?)",
+                (skey, json.dumps(payload)),
+            )
+            self._db.commit()
+
+    def _remember(self, skey: str, payload: Dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+        self._lru[skey] = payload
+        self._lru.move_to_end(skey)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> str:
+        return f"cache: {self.hits} hits, {self.misses} misses, hit rate {self.hit_rate():.1%}"
+
+    def destroy(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -1,10 +1,26 @@
-from typing import Literal, Set
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Literal, Sequence, Set, Tuple
 
+import numpy as np
 import sympy as sp  # type: ignore
 
-from config import PRECISION, SAMPLES_COUNT
+from config import (
+    PRECISION,
+    SAMPLES_COUNT,
+    SINGULARITY_TIMEOUT,
+    SINGULARITY_TOLERANCE,
+)
 from logger import GlobalLogger
-from utils.math import Number, f_str_expr_to_sp_lambda
+from utils.math import (
+    Number,
+    closed_form_class,
+    compile_kernel,
+    derivative_kernel,
+    f_str_expr_to_sp_lambda,
+    hoist_constants,
+    singularity_suspects,
+)
+from utils.meta import run_in_process, run_with_timeout
 from utils.reader import Preset
 from utils.validation import to_sp_float
 
@@ -14,20 +30,36 @@ logger = GlobalLogger()
 class FunctionExpr:
     symbol: sp.Symbol = sp.symbols("x")
     f: sp.Lambda
+    # f(symbol); unlike f.expr always in terms of symbol (Lambda(x, x) uses a dummy)
+    expr: sp.Expr
+    # interval of interest, if known; singularity analysis is limited to it
+    interval: Tuple[sp.Float, sp.Float] | None = None
 
     singularities: Set[sp.Float]
+    # exact symbolic location of each singularity, where known (e.g. pi/2)
+    _exact_singularities: Dict[sp.Float, sp.Expr]
     fixable_singularities: Set[sp.Float]
     inf_singularities: Set[sp.Float]
 
+    # fixable singularities as native floats, sorted, with their limit values
+    fixable_xs: np.ndarray
+    fixable_ys: np.ndarray
+    fixable_limits: List[sp.Float]
+
+    _kernel: Callable[[Any], Any] | None = None
+    _limits: Dict[Tuple[Any, str | None], sp.Float]
+
     def __init__(
         self,
         f_str: str | None = None,
         f: sp.Lambda | None = None,
+        interval: Tuple[Number, Number] | None = None,
     ) -> None:
         """
         supported variants:
         1. FunctionExpr(f=)
         2. FunctionExpr(f_str=)
+        optionally with interval=(l, r) to enable the numeric pre-screen
         """
         if f is not None:
             self.f = f
@@ -35,47 +67,179 @@ class FunctionExpr:
             self.f = f_str_expr_to_sp_lambda(f_str)
         else:
             raise ValueError("f or f_str must be provided")
+        self.expr = self.f(self.symbol)
+        if interval is not None:
+            self.interval = (to_sp_float(interval[0]), to_sp_float(interval[1]))
 
+        self._exact_singularities = {}
+        self._limits = {}
         self.singularities = self._find_singularities()
         self.inf_singularities = self._find_inf_singularities()
         self.fixable_singularities = self._find_fixable_singularities()
+        self._build_fixable_lookup()
 
     def _find_singularities(self) -> Set[sp.Float]:
-        return {
-            to_sp_float(x)
-            for x in sp.singularities(self.f.expr, self.symbol, domain=sp.S.Reals)
-        }
+        """
+        numeric pre-screen over the interval (if known) first; the symbolic
+        analysis (with a timeout) only runs when something suspicious is found
+        or the pre-screen is not conclusive
+        """
+        exact: Set[float] = set()
+        if self.interval is not None and all(x.is_finite for x in self.interval):
+            l, r = self.interval
+            exact, approx, conclusive = singularity_suspects(
+                self.expr, self.symbol, float(l), float(r)
+            )
+            if conclusive and not exact and not approx:
+                logger.debug(
+                    f"no singularity suspects on [{l}, {r}]; skipping symbolic analysis"
+                )
+                return set()
+            logger.debug(f"singularity suspects: exact={exact}, approx={approx}")
+
+        found = run_with_timeout(
+            lambda: self._symbolic_singularities(), SINGULARITY_TIMEOUT
+        )
+        if found is None or not (
+            isinstance(found, sp.FiniteSet) or found == sp.S.EmptySet
+        ):
+            logger.warning(
+                f"symbolic singularity detection failed for {self.expr} ({found=}); "
+                f"using numeric suspects {exact}"
+            )
+            return {to_sp_float(x) for x in exact}
+        self._exact_singularities = {to_sp_float(sp.N(x, PRECISION)): x for x in found}
+        return set(self._exact_singularities.keys())
+
+    def _symbolic_singularities(self) -> Any:
+        found = sp.singularities(self.expr, self.symbol, domain=sp.S.Reals)
+        if not isinstance(found, sp.FiniteSet) and self.interval is not None:
+            # e.g. periodic singularities: keep the ones in the interval
+            found = found.intersect(sp.Interval(*self.interval))
+        return found
+
+    def _singularity_limit(self, s: sp.Float) -> sp.Float:
+        x = self._exact_singularities.get(s, s)
+        try:
+            return self.limit(x, dir="+-")
+        except ValueError as e:
+            # one-sided limits differ; at a bound of the interval only the inner side matters
+            if self.interval is not None and s == self.interval[0]:
+                return self.limit(x, dir="+")
+            if self.interval is not None and s == self.interval[1]:
+                return self.limit(x, dir="-")
+            logger.debug(f"no two-sided limit at {s}: {e}")
+            return sp.oo
 
     def _find_inf_singularities(self) -> Set[sp.Float]:
         return {
-            s
-            for s in self._find_singularities()
-            if abs(self.limit(s, dir="+-")) == sp.oo
+            s for s in self.singularities if abs(self._singularity_limit(s)) == sp.oo
         }
 
     def _find_fixable_singularities(self) -> Set[sp.Float]:
         return {
             s
-            for s in self._find_singularities()
-            if abs(self.limit(s, dir="+-")) is not sp.oo
+            for s in self.singularities
+            if abs(self._singularity_limit(s)) is not sp.oo
         }
 
+    def _build_fixable_lookup(self) -> None:
+        points = sorted(self.fixable_singularities)
+        self.fixable_limits = [self._singularity_limit(s) for s in points]
+        self.fixable_xs = np.array([float(s) for s in points], dtype=np.float64)
+        self.fixable_ys = np.array(
+            [float(y) for y in self.fixable_limits], dtype=np.float64
+        )
+
+    def _fixable_index(self, x: float) -> int | None:
+        """
+        index of the fixable singularity matching x (within tolerance), if any
+        """
+        xs = self.fixable_xs
+        i = bisect_left(xs, x)
+        for j in (i - 1, i):
+            if 0 <= j < len(xs) and abs(xs[j] - x) <= SINGULARITY_TOLERANCE * max(
+                1.0, abs(x)
+            ):
+                return j
+        return None
+
     def f_str(self) -> str:
-        return str(self.f.expr)
+        return str(self.expr)
+
+    def kernel(self) -> Callable[[Any], Any]:
+        """
+        vectorized float64 evaluator of f (no singularity patching)
+        """
+        if self._kernel is None:
+            self._kernel = compile_kernel(self.expr, self.symbol, optimize=True)
+        return self._kernel
 
     def compute(self, x: Number) -> sp.Float:
+        if len(self.fixable_xs) > 0:
+            i = self._fixable_index(float(x))
+            if i is not None:
+                logger.debug(
+                    f"fixable singularity at {x}, using limit={self.fixable_limits[i]}"
+                )
+                return self.fixable_limits[i]
         x_sp_float = to_sp_float(x)
-        if x_sp_float in self.fixable_singularities:
-            logger.debug(
-                f"fixable singularity at {x_sp_float}, computing limit={self.limit(x_sp_float, dir='+-')}"
-            )
-            return self.limit(x_sp_float, dir="+-")
         return self.f(x_sp_float).subs({sp.symbols("x"): x}).evalf(PRECISION)
 
+    def compute_many(self, xs: Any) -> np.ndarray:
+        """
+        vectorized float64 evaluation; fixable singularities are patched with
+        their limits via a single mask
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        return self.patch_fixable(xs, self.kernel()(xs))
+
+    def patch_fixable(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        replaces values at fixable singularities with the limits
+        """
+        k = len(self.fixable_xs)
+        if k == 0:
+            return ys
+        i = np.searchsorted(self.fixable_xs, xs)
+        left = np.clip(i - 1, 0, k - 1)
+        right = np.clip(i, 0, k - 1)
+        nearest = np.where(
+            np.abs(self.fixable_xs[left] - xs) <= np.abs(self.fixable_xs[right] - xs),
+            left,
+            right,
+        )
+        tol = SINGULARITY_TOLERANCE * np.maximum(1.0, np.abs(xs))
+        mask = np.abs(self.fixable_xs[nearest] - xs) <= tol
+        if np.any(mask):
+            ys = np.where(mask, self.fixable_ys[nearest], ys)
+        return ys
+
     def limit(
         self, x: Number, dir: Literal["+"] | Literal["-"] | Literal["+-"] | None = None
     ) -> sp.Float:
-        return sp.limit(self.f.expr, self.symbol, x, dir=dir).evalf(PRECISION)
+        """
+        memoized per (x, dir)
+        """
+        key = (x, dir)
+        if key not in self._limits:
+            self._limits[key] = sp.limit(self.expr, self.symbol, x, dir=dir).evalf(
+                PRECISION
+            )
+        return self._limits[key]
+
+    def derivative(self, order: int = 1) -> Callable[[Any], Any]:
+        """
+        vectorized d^order f / dx^order (symbolic, compiled once per expression)
+        """
+        return derivative_kernel(self.f, order)
+
+    def max_abs_derivative(self, order: int, l: Number, r: Number) -> sp.Float:
+        xs = np.linspace(float(l), float(r), SAMPLES_COUNT + 1)
+        ys = np.abs(self.derivative(order)(xs))
+        if np.all(np.isnan(ys)):
+            return to_sp_float("nan")
+        return to_sp_float(float(np.nanmax(ys)))
 
     def continuous(self, l: Number, r: Number) -> bool:
         x = l
@@ -106,6 +270,196 @@ class FunctionExpr:
     def __repr__(self) -> str:
         return self.__str__()
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # compiled numpy kernels are not picklable; workers recompile lazily
+        state = self.__dict__.copy()
+        state.pop("_kernel", None)
+        return state
+
+
+class ParametricFunctionExpr:
+    """
+    f(x; params), parsed and compiled once into a numpy kernel that takes
+    parameter arrays; there is no singularity analysis up front: nodes where
+    f is not finite are patched with the limit of f there (in terms of the
+    parameters, found once per node), the others surface as non-converged
+    solutions
+    """
+
+    symbol: sp.Symbol = FunctionExpr.symbol
+    params: Tuple[sp.Symbol, ...]
+    expr: sp.Expr
+    _kernel: Callable[..., Any]
+    # x -> compiled limit of f at x as a function of the params (None: no finite limit)
+    _limits: Dict[float, Callable[..., Any] | None]
+
+    def __init__(self, f_str: str, params: Sequence[str]) -> None:
+        if not params:
+            raise ValueError("at least one parameter is required")
+        f = f_str_expr_to_sp_lambda(f_str, params)
+        self.params = tuple(sp.Symbol(p) for p in params)
+        self.expr = f(self.symbol, *self.params)
+        self._kernel = sp.lambdify(
+            (self.symbol, *self.params), hoist_constants(self.expr), "numpy", cse=True
+        )
+        self._limits = {}
+
+    def f_str(self) -> str:
+        return str(self.expr)
+
+    def _limit_kernel(self, x: float) -> Callable[..., Any] | None:
+        """
+        limit of f at x compiled as a function of the params (memoized);
+        None when sympy finds no finite limit in time
+        """
+        if x not in self._limits:
+            try:
+                found = run_with_timeout(
+                    lambda: sp.limit(self.expr, self.symbol, sp.Float(x)),
+                    SINGULARITY_TIMEOUT,
+                )
+            except Exception as e:
+                logger.debug(f"limit of {self.expr} at x={x} failed: {e}")
+                found = None
+            if found is None or found.has(sp.oo, -sp.oo, sp.zoo, sp.nan):
+                logger.debug(f"no finite limit of {self.expr} at x={x} ({found=})")
+                self._limits[x] = None
+            else:
+                logger.debug(f"limit of {self.expr} at x={x}: {found}")
+                self._limits[x] = sp.lambdify(self.params, found, "numpy")
+        return self._limits[x]
+
+    def compute_grid(self, xs: np.ndarray, param_values: np.ndarray) -> np.ndarray:
+        """
+        param_values: (m, len(params)) -> values of shape (m, len(xs))
+        """
+        shape = (len(param_values), len(xs))
+        args = [param_values[:, i][:, None] for i in range(len(self.params))]
+        with np.errstate(all="ignore"):
+            ys = np.asarray(self._kernel(xs[None, :], *args), dtype=np.float64)
+        if ys.shape != shape:
+            ys = np.broadcast_to(ys, shape).copy()
+        bad = ~np.isfinite(ys)
+        for j in np.flatnonzero(np.any(bad, axis=0)):
+            limit = self._limit_kernel(float(xs[j]))
+            if limit is None:
+                continue
+            rows = bad[:, j]
+            with np.errstate(all="ignore"):
+                ys[rows, j] = np.broadcast_to(
+                    limit(*(param_values[rows, i] for i in range(len(self.params)))),
+                    (int(np.count_nonzero(rows)),),
+                )
+        return ys
+
+    def __str__(self) -> str:
+        expr, params = self.expr, self.params
+        return f"ParametricFunctionExpr({expr=}, {params=})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class MultiFunctionExpr:
+    """
+    f(x, y[, z]), parsed and compiled once into a numpy kernel of all the
+    variables; like ParametricFunctionExpr there is no singularity analysis,
+    non-finite values are reported by the solvers
+    """
+
+    VARIABLES = ("x", "y", "z")
+
+    symbols: Tuple[sp.Symbol, ...]
+    expr: sp.Expr
+    _kernel: Callable[..., Any]
+
+    def __init__(self, f_str: str, dimensions: int) -> None:
+        if not 2 <= dimensions <= len(self.VARIABLES):
+            raise ValueError(
+                f"expected 2 to {len(self.VARIABLES)} variables, got {dimensions}"
+            )
+        names = self.VARIABLES[1:dimensions]
+        f = f_str_expr_to_sp_lambda(f_str, names)
+        self.symbols = (FunctionExpr.symbol, *(sp.Symbol(n) for n in names))
+        self.expr = f(*self.symbols)
+        self._kernel = sp.lambdify(
+            self.symbols, hoist_constants(self.expr), "numpy", cse=True
+        )
+
+    @property
+    def dimensions(self) -> int:
+        return len(self.symbols)
+
+    def f_str(self) -> str:
+        return str(self.expr)
+
+    def compute_grid(self, axes: Sequence[np.ndarray]) -> np.ndarray:
+        """
+        values on the tensor grid of axes (the nodes of every variable),
+        broadcast without building the grid: shape (len(axes[0]), ...)
+        """
+        shape = tuple(len(a) for a in axes)
+        args = [
+            np.asarray(a, dtype=np.float64).reshape(
+                [-1 if i == j else 1 for j in range(len(axes))]
+            )
+            for i, a in enumerate(axes)
+        ]
+        with np.errstate(all="ignore"):
+            ys = np.asarray(self._kernel(*args), dtype=np.float64)
+        if ys.shape != shape:
+            ys = np.broadcast_to(ys, shape).copy()
+        return ys
+
+    def compute_points(self, points: np.ndarray) -> np.ndarray:
+        """
+        points: (m, dimensions) -> values of shape (m,)
+        """
+        with np.errstate(all="ignore"):
+            ys = np.asarray(self._kernel(*points.T), dtype=np.float64)
+        if ys.shape != (len(points),):
+            ys = np.broadcast_to(ys, (len(points),)).copy()
+        return ys
+
+    def __str__(self) -> str:
+        expr, symbols = self.expr, self.symbols
+        return f"MultiFunctionExpr({expr=}, {symbols=})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class BoxIntegralExpr:
+    """
+    integral of f(x, y[, z]) over the box bounds[0] x bounds[1] (x ...),
+    one finite (l, r) pair per variable
+    """
+
+    fn: MultiFunctionExpr
+    bounds: List[Tuple[float, float]]
+
+    def __init__(self, f_str: str, bounds: Sequence[Tuple[Number, Number]]) -> None:
+        self.bounds = [(float(l), float(r)) for l, r in bounds]
+        for symbol, (l, r) in zip(MultiFunctionExpr.VARIABLES, self.bounds):
+            if not (np.isfinite(l) and np.isfinite(r)):
+                raise ValueError(
+                    f"box integrals need finite bounds, got {symbol} in [{l}, {r}]"
+                )
+            if l > r:
+                raise ValueError(f"{symbol}: left bound must be less than right bound")
+        self.fn = MultiFunctionExpr(f_str, len(self.bounds))
+
+    @property
+    def volume(self) -> float:
+        return float(np.prod([r - l for l, r in self.bounds]))
+
+    def __str__(self) -> str:
+        fn, bounds = self.fn, self.bounds
+        return f"BoxIntegral({fn=}, {bounds=})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
 
 class IntegralExpr:
     fn: FunctionExpr
@@ -120,6 +474,7 @@ class IntegralExpr:
         f_str: str | None = None,
         f: sp.Lambda | None = None,
         fn: FunctionExpr | None = None,
+        validate: bool = True,
     ) -> None:
         """
         supported variants:
@@ -127,11 +482,14 @@ class IntegralExpr:
         2. IntegralExpr(interval_l=, interval_r=, fn=)
         3. IntegralExpr(interval_l=, interval_r=, f=)
         4. IntegralExpr(interval_r=, interval_r=, f_str=)
+        validate=False skips the continuity check (see view())
         """
         if preset is not None:
-            self.interval_l = preset.interval_l
-            self.interval_r = preset.interval_r
-            self.fn = FunctionExpr(f_str=preset.f_expr)
+            self.interval_l = to_sp_float(preset.interval_l)
+            self.interval_r = to_sp_float(preset.interval_r)
+            self.fn = FunctionExpr(
+                f_str=preset.f_expr, interval=(self.interval_l, self.interval_r)
+            )
         else:
             if interval_l is None:
                 raise ValueError("interval_l is required")
@@ -142,7 +500,9 @@ class IntegralExpr:
             if fn:
                 self.fn = fn
             else:
-                self.fn = FunctionExpr(f=f, f_str=f_str)
+                self.fn = FunctionExpr(
+                    f=f, f_str=f_str, interval=(self.interval_l, self.interval_r)
+                )
 
         if self.interval_l > self.interval_r:
             raise ValueError("interval left bound must be less than right bound")
@@ -152,11 +512,45 @@ class IntegralExpr:
         # if abs(self.fn.limit(self.interval_r, dir="-")) == sp.oo:
         #     self.interval_r = self.interval_r - EPS
 
-        if not self.fn.continuous(self.interval_l, self.interval_r):
+        if validate and not self.fn.continuous(self.interval_l, self.interval_r):
             raise ValueError(
                 f"function {self.fn} is not continuous on interval [{self.interval_l}, {self.interval_r}]"
             )
 
+    def view(self, interval_l: sp.Float, interval_r: sp.Float) -> "IntegralExpr":
+        """
+        lightweight integral over a sub-interval: shares fn (and its analysis)
+        and is not re-validated, since the whole interval already was
+        """
+        return IntegralExpr(
+            interval_l=interval_l, interval_r=interval_r, fn=self.fn, validate=False
+        )
+
+    def to_finite(self) -> "IntegralExpr":
+        """
+        equivalent integral over a finite interval, for infinite bounds:
+        - [a, oo):   x = a + t/(1-t),  t in [0, 1]
+        - (-oo, b]:  x = b - t/(1-t),  t in [0, 1]
+        - (-oo, oo): x = t/(1-t^2),    t in [-1, 1]
+        """
+        a, b = self.interval_l, self.interval_r
+        t = FunctionExpr.symbol
+        expr = self.fn.expr
+        if a == -sp.oo and b == sp.oo:
+            x, dx = t / (1 - t**2), (1 + t**2) / (1 - t**2) ** 2
+            l, r = to_sp_float(-1), to_sp_float(1)
+        elif b == sp.oo:
+            x, dx = a + t / (1 - t), 1 / (1 - t) ** 2
+            l, r = to_sp_float(0), to_sp_float(1)
+        elif a == -sp.oo:
+            x, dx = b - t / (1 - t), 1 / (1 - t) ** 2
+            l, r = to_sp_float(0), to_sp_float(1)
+        else:
+            return self
+        g = sp.Lambda(t, expr.subs(t, x) * dx)
+        logger.debug(f"mapped [{a}, {b}] onto [{l}, {r}]: {g.expr}")
+        return IntegralExpr(interval_l=l, interval_r=r, f=g)
+
     def is_improper(self) -> Literal[1] | Literal[2] | None:
         """
         returns:
@@ -166,7 +560,7 @@ class IntegralExpr:
         """
         a, b = self.interval_l, self.interval_r
 
-        if a is -sp.oo or b == sp.oo:
+        if a == -sp.oo or b == sp.oo:
             return 1
 
         if len(self.get_inf_singularities_in_interval()) > 0:
@@ -188,7 +582,8 @@ class IntegralExpr:
 
         if proper_order == 1:
             logger.warning(
-                f"{self} is a 1-st order improper integral (with infinite interval); assuming divergent"
+                f"{self} is a 1-st order improper integral (with infinite interval); "
+                "map it with to_finite() first"
             )
             return False
 
@@ -202,6 +597,35 @@ class IntegralExpr:
 
         return True
 
+    def closed_form(self, timeout: float) -> sp.Float | None:
+        """
+        exact value via sp.integrate for the expression classes of
+        closed_form_class, given at most `timeout` seconds; None when the class
+        is not recognized, sympy gives up or runs out of time, or the value
+        is not a finite real number (divergent integrals are left to the
+        numeric solvers, which report them)
+        """
+        kind = closed_form_class(self.fn.expr, self.fn.symbol)
+        if kind is None or self.get_inf_singularities_in_interval():
+            return None
+        bounds = (self.fn.symbol, self.interval_l, self.interval_r)
+        try:
+            # a process, as sympy cannot be stopped once it times out
+            value = run_in_process(lambda: sp.integrate(self.fn.expr, bounds), timeout)
+        except Exception as e:
+            logger.debug(f"exact integration failed: {e}")
+            return None
+        if value is None:
+            logger.debug(f"exact integration of {kind} timed out after {timeout}s")
+            return None
+        if value.has(sp.Integral):
+            return None
+        value = sp.N(value, PRECISION)
+        if not value.is_real or not value.is_finite:
+            return None
+        logger.debug(f"exact integration of {kind} {self.fn.expr}: {value}")
+        return to_sp_float(value)
+
     def get_inf_singularities_in_interval(self) -> Set[sp.Float]:
         return {
             x
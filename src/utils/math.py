@@ -1,14 +1,25 @@
 import math
 import re
-from typing import Callable
+from functools import lru_cache
+from typing import Any, Callable, List, Sequence, Set, Tuple
 
+import numpy as np
 import sympy as sp  # type: ignore
 
-from config import DERIVATIVE_PRECISION
+from config import (
+    DERIVATIVE_PRECISION,
+    PRESCREEN_BLOWUP,
+    PRESCREEN_MAX_PEAKS,
+    PRESCREEN_PEAK,
+)
 from logger import GlobalLogger
 from utils.validation import to_sp_float
 
 SAMPLES_COUNT = 1000
+REFINE_POINTS = 64  # samples per zoom around a peak of the pre-screen
+REFINE_ROUNDS = 4
+# special functions (gamma, erf, ...) are missing from numpy
+KERNEL_MODULES = ["scipy", "numpy"]
 
 type Number = int | float | sp.Float
 
@@ -16,25 +27,318 @@ type Number = int | float | sp.Float
 logger = GlobalLogger()
 
 
-def df(f: Callable[[Number], Number], x: Number) -> sp.Float:
-    # return derivative(f, x)["df"]
+def _fold_constant(expr: sp.Expr) -> sp.Expr:
+    value = expr.evalf(17)
+    return sp.Float(value, 17) if value.is_real else expr
+
+
+def hoist_constants(expr: sp.Expr) -> sp.Expr:
+    """
+    folds every constant subtree (e.g. sqrt(2)*pi, including the constant
+    factors/terms of a product/sum) into one float
+    """
+    if expr.is_Atom:
+        return expr
+    if expr.is_number:
+        return _fold_constant(expr)
+    if not (expr.is_Add or expr.is_Mul):
+        return expr.func(*(hoist_constants(arg) for arg in expr.args))
+    args = [hoist_constants(arg) for arg in expr.args if not arg.is_number]
+    constants = [arg for arg in expr.args if arg.is_number]
+    if len(constants) == 1 and constants[0].is_Atom:
+        args.append(constants[0])
+    elif constants:
+        args.append(_fold_constant(expr.func(*constants)))
+    return expr.func(*args)
+
+
+def kernel_op_count(expr: sp.Expr) -> int:
+    """
+    operations per point of expr compiled with common subexpression elimination
+    """
+    replacements, reduced = sp.cse(expr)
+    return int(
+        sum(sp.count_ops(sub) for _, sub in replacements)
+        + sum(sp.count_ops(e) for e in reduced)
+    )
+
+
+def optimize_expr(expr: sp.Expr, symbol: sp.Symbol) -> sp.Expr:
+    """
+    cheaper to evaluate equivalent of expr, for compiled kernels only (analysis
+    keeps the original): removable factors of rational functions are cancelled
+    (which also fills in their removable singularities) and constants hoisted;
+    kept only if it does not increase the op count
+    """
+    optimized = expr
+    if expr.is_rational_function(symbol):
+        optimized = sp.cancel(expr)
+    optimized = hoist_constants(optimized)
+    if sp.count_ops(optimized) > sp.count_ops(expr):
+        return expr
+    return optimized
+
+
+def compile_kernel(
+    expr: sp.Expr, symbol: sp.Symbol, optimize: bool = False
+) -> Callable[[Any], Any]:
+    """
+    compiles expr into a vectorized numpy function of symbol, with common
+    subexpressions evaluated once per call (and optimize_expr applied first
+    if optimize); result is always broadcast to the shape of the input
+    (constant exprs included)
+    """
+    if optimize:
+        optimized = optimize_expr(expr, symbol)
+        logger.debug(
+            f"kernel for {expr}: {sp.count_ops(expr)} -> "
+            f"{kernel_op_count(optimized)} ops per point"
+            + ("" if optimized == expr else f" as {optimized}")
+        )
+        expr = optimized
+    fn = sp.lambdify(symbol, expr, modules=KERNEL_MODULES, cse=True)
+
+    def kernel(x: Any) -> Any:
+        x_arr = np.asarray(x, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            y = np.asarray(fn(x_arr), dtype=np.float64)
+        if y.shape != x_arr.shape:
+            y = np.broadcast_to(y, x_arr.shape).copy()
+        return y
+
+    return kernel
+
+
+def compile_batch_kernel(
+    exprs: Sequence[sp.Expr], symbol: sp.Symbol
+) -> Callable[[Any], np.ndarray]:
+    """
+    compiles several exprs into one vectorized function returning a
+    (len(exprs), *x.shape) array; subexpressions shared between them
+    are evaluated once
+    """
+    fn = sp.lambdify(
+        symbol,
+        [optimize_expr(e, symbol) for e in exprs],
+        modules=KERNEL_MODULES,
+        cse=True,
+    )
+
+    def kernel(x: Any) -> np.ndarray:
+        x_arr = np.asarray(x, dtype=np.float64)
+        out = np.empty((len(exprs), *x_arr.shape), dtype=np.float64)
+        with np.errstate(all="ignore"):
+            for i, y in enumerate(fn(x_arr)):
+                out[i] = y
+        return out
+
+    return kernel
+
+
+@lru_cache(maxsize=None)
+def derivative_kernel(f: sp.Lambda, order: int) -> Callable[[Any], Any]:
+    """
+    d^order f / dx^order, differentiated symbolically once and compiled;
+    cached per (f, order)
+    """
+    (symbol,) = f.variables
+    logger.debug(f"compiling derivative of order {order} for {f.expr}")
+    return compile_kernel(sp.diff(f.expr, symbol, order), symbol, optimize=True)
+
+
+def _derivative(f: Callable[[Number], Number], x: Number, order: int) -> sp.Float:
+    if isinstance(f, sp.Lambda):
+        return to_sp_float(float(derivative_kernel(f, order)(float(x))))
+    # plain callables have no expression to differentiate; fall back to finite differences
     H = to_sp_float(DERIVATIVE_PRECISION)
-    return (f(x + H) - f(x - H)) / (2 * H)
+    if order == 1:
+        return (f(x + H) - f(x - H)) / (2 * H)
+    if order == 2:
+        return (f(x + H) - 2 * f(x) + f(x - H)) / H**2
+    if order == 3:
+        return (f(x + H) - 3 * f(x) + 3 * f(x - H) - f(x - 2 * H)) / H**3
+    if order == 4:
+        return (
+            f(x + H) - 4 * f(x) + 6 * f(x - H) - 4 * f(x - 2 * H) + f(x - 3 * H)
+        ) / H**4
+    raise ValueError(f"unsupported derivative order {order}")
+
+
+def df(f: Callable[[Number], Number], x: Number) -> sp.Float:
+    return _derivative(f, x, 1)
 
 
 def d2f(f: Callable[[Number], Number], x: Number) -> sp.Float:
-    H = to_sp_float(DERIVATIVE_PRECISION)
-    return (f(x + H) - 2 * f(x) + f(x - H)) / H**2
+    return _derivative(f, x, 2)
 
 
 def d3f(f: Callable[[Number], Number], x: Number) -> sp.Float:
-    H = to_sp_float(DERIVATIVE_PRECISION)
-    return (f(x + H) - 3 * f(x) + 3 * f(x - H) - f(x - 2 * H)) / H**3
+    return _derivative(f, x, 3)
 
 
 def d4f(f: Callable[[Number], Number], x: Number) -> sp.Float:
-    H = to_sp_float(DERIVATIVE_PRECISION)
-    return (f(x + H) - 4 * f(x) + 6 * f(x - H) - 4 * f(x - 2 * H) + f(x - 3 * H)) / H**4
+    return _derivative(f, x, 4)
+
+
+def _peak_grows(
+    kernel: Callable[[Any], Any], xs: np.ndarray, i: int, peak: float
+) -> float | None:
+    """
+    zooms in around the sample xs[i] (a local peak of |f|); returns where |f|
+    keeps growing (or is not finite), as a pole does, else None
+    """
+    l, r = xs[max(i - 1, 0)], xs[min(i + 1, len(xs) - 1)]
+    for _ in range(REFINE_ROUNDS):
+        fine = np.linspace(l, r, REFINE_POINTS + 1)
+        mags = np.abs(kernel(fine))
+        if not np.all(np.isfinite(mags)):
+            return float(fine[np.argmin(np.isfinite(mags))])
+        j = int(np.argmax(mags))
+        if mags[j] > PRESCREEN_PEAK * peak:
+            return float(fine[j])
+        l, r = fine[max(j - 1, 0)], fine[min(j + 1, REFINE_POINTS)]
+    return None
+
+
+def singularity_suspects(
+    expr: sp.Expr, symbol: sp.Symbol, l: float, r: float
+) -> Tuple[Set[float], Set[float], bool]:
+    """
+    cheap numeric pre-screen of [l, r] for singularities:
+    - real roots of polynomial denominators
+    - samples where the vectorized expression is not finite
+    - blow-ups (huge values compared to the typical magnitude, or sign flips
+      between two huge values) between samples
+    - sharp local peaks of |f| that keep growing when zoomed into (even-order
+      poles keep their sign and may fall between samples)
+    returns (exact suspects, approximate suspects, conclusive); the screen is
+    not conclusive (no suspects do not rule singularities out) if the
+    denominator is not a polynomial or the expression cannot be sampled
+    """
+    exact: Set[float] = set()
+    approx: Set[float] = set()
+
+    _, den = sp.fraction(sp.together(expr))
+    conclusive = not den.has(symbol) or den.is_polynomial(symbol)
+    if den.has(symbol) and den.is_polynomial(symbol):
+        for root in sp.Poly(den, symbol).nroots():
+            if abs(sp.im(root)) < 1e-12 and l <= float(sp.re(root)) <= r:
+                exact.add(float(sp.re(root)))
+
+    xs = np.linspace(l, r, SAMPLES_COUNT + 1)
+    kernel = compile_kernel(expr, symbol)
+    try:
+        ys = kernel(xs)
+    except Exception as e:
+        logger.debug(f"cannot sample {expr} for the pre-screen: {e}")
+        return exact, approx, False
+    finite = np.isfinite(ys)
+    exact.update(float(x) for x in xs[~finite])
+
+    magnitudes = np.abs(ys[finite])
+    if len(magnitudes) > 0:
+        typical = float(np.median(magnitudes))
+        huge = finite & (np.abs(ys) > PRESCREEN_BLOWUP * (typical + 1))
+        approx.update(float(x) for x in xs[huge])
+        # a continuous function is small next to a sign change; a pole is not
+        with np.errstate(all="ignore"):
+            flips = finite[:-1] & finite[1:] & (np.sign(ys[:-1]) * np.sign(ys[1:]) < 0)
+            steep = np.minimum(np.abs(ys[:-1]), np.abs(ys[1:])) > 10 * typical
+        approx.update(float(x) for x in ((xs[:-1] + xs[1:]) / 2)[flips & steep])
+
+        mags = np.where(finite, np.abs(ys), 0.0)
+        inner = mags[2:-2]
+        sharp = (
+            (inner >= mags[1:-3])
+            & (inner >= mags[3:-1])
+            & (inner > PRESCREEN_PEAK * np.maximum(mags[:-4], mags[4:]))
+        )
+        peaks = 2 + np.flatnonzero(sharp)
+        for i in peaks[np.argsort(-mags[peaks])][:PRESCREEN_MAX_PEAKS]:
+            if mags[i] > PRESCREEN_BLOWUP * max(mags[i - 2], mags[i + 2]):
+                approx.add(float(xs[i]))
+                continue
+            x = _peak_grows(kernel, xs, int(i), float(mags[i]))
+            if x is not None:
+                approx.add(x)
+    return exact, approx, conclusive
+
+
+# functions with antiderivatives sympy finds quickly and reliably
+_ELEMENTARY = (
+    sp.exp,
+    sp.log,
+    sp.sin,
+    sp.cos,
+    sp.tan,
+    sp.sinh,
+    sp.cosh,
+    sp.tanh,
+    sp.asin,
+    sp.acos,
+    sp.atan,
+)
+
+
+def closed_form_class(expr: sp.Expr, symbol: sp.Symbol) -> str | None:
+    """
+    "polynomial", "rational" or "elementary" (only _ELEMENTARY functions, each
+    of a polynomial argument, and powers with an integer exponent, a constant
+    exponent of a polynomial like sqrt(1 - x**2) or a constant base like 2**x)
+    if exact integration is worth trying, else None
+    """
+    if expr.is_polynomial(symbol):
+        return "polynomial"
+    if expr.is_rational_function(symbol):
+        return "rational"
+    for fn in expr.atoms(sp.Function):
+        if not isinstance(fn, _ELEMENTARY) or not fn.args[0].is_polynomial(symbol):
+            return None
+    for power in expr.atoms(sp.Pow):
+        base, exponent = power.args
+        if exponent.is_Integer:
+            continue
+        if exponent.is_number and base.is_polynomial(symbol):
+            continue
+        if base.is_number and exponent.is_polynomial(symbol):
+            continue
+        return None
+    return "elementary"
+
+
+type OscillatoryTerm = Tuple[sp.Expr, str, float, float]
+
+
+def split_oscillatory(
+    expr: sp.Expr, symbol: sp.Symbol
+) -> Tuple[List[OscillatoryTerm], sp.Expr]:
+    """
+    splits expr into terms g(x) * sin|cos(w*x + phi) (w, phi constants, the
+    trig factor with the largest |w| of each term) and the remaining
+    non-oscillatory part
+    returns ([(g, "sin"|"cos", w, phi), ...], rest)
+    """
+    terms: List[OscillatoryTerm] = []
+    rest = sp.Integer(0)
+    for term in sp.Add.make_args(expr):
+        best: Tuple[sp.Expr, float, float] | None = None
+        for factor in sp.Mul.make_args(term):
+            if not isinstance(factor, (sp.sin, sp.cos)):
+                continue
+            arg = factor.args[0]
+            w = sp.diff(arg, symbol)
+            phi = sp.expand(arg - w * symbol)
+            if not w.is_number or w == 0 or phi.has(symbol) or not phi.is_number:
+                continue
+            if best is None or abs(float(w)) > abs(best[1]):
+                best = (factor, float(w), float(phi))
+        if best is None:
+            rest += term
+            continue
+        factor, w, phi = best
+        kind = "sin" if isinstance(factor, sp.sin) else "cos"
+        terms.append((term / factor, kind, w, phi))
+    return terms, rest
 
 
 def keeps_sign(f: Callable[[Number], Number], l: Number, r: Number) -> bool:
@@ -101,17 +405,27 @@ def normalize_f_str(f_str: str) -> str:
     return f_str
 
 
-def f_str_expr_to_sp_lambda(f_str: str) -> sp.Lambda:
+def f_str_expr_to_sp_lambda(f_str: str, params: Sequence[str] = ()) -> sp.Lambda:
+    """
+    params: names of symbols allowed besides x; the result is then
+    Lambda((x, *params), expr)
+    """
     f_str = f_str.replace(",", ".").replace("^", "**")
+    for p in params:
+        if not p.isidentifier() or p == "x":
+            raise ValueError(f"Invalid parameter name {p!r}")
     allowed_functions = (
         "("
         + "|".join(
-            filter(
-                lambda s: not s.startswith("_")
-                and not s.endswith("_")
-                and s not in {"inf", "nan"},
-                math.__dict__.keys(),
-            )
+            [
+                *filter(
+                    lambda s: not s.startswith("_")
+                    and not s.endswith("_")
+                    and s not in {"inf", "nan"},
+                    math.__dict__.keys(),
+                ),
+                *params,
+            ]
         )
         + ")"
     )
@@ -119,15 +433,21 @@ def f_str_expr_to_sp_lambda(f_str: str) -> sp.Lambda:
     if not re.match(allowed_pattern, f_str):
         raise ValueError("Invalid characters in the equation")
     x = sp.symbols("x")
+    param_symbols = [sp.Symbol(p) for p in params]
     try:
-        expr = sp.sympify(f_str)
+        expr = sp.sympify(f_str, locals={p.name: p for p in param_symbols})
     except sp.SympifyError:
         raise ValueError("Invalid equation format")
     used_symbols = expr.free_symbols
-    if len(used_symbols) > 1:
+    allowed_symbols = {x, *param_symbols}
+    if not used_symbols <= allowed_symbols:
+        allowed_str = ", ".join(f"'{s}'" for s in ["x", *params])
+        verb = "are" if params else "is"
         raise ValueError(
-            f"Invalid variable(s) {used_symbols - {x}} in the equation. Only 'x' is allowed."
+            f"Invalid variable(s) {used_symbols - allowed_symbols} in the equation. Only {allowed_str} {verb} allowed."
         )
     logger.debug("parsed expression", expr)
+    if params:
+        return sp.Lambda((x, *param_symbols), expr)
     func = sp.Lambda(x, expr)
     return func
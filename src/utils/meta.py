@@ -1,10 +1,14 @@
+import multiprocessing
+import threading
 import traceback
-from typing import Any
+from typing import Any, Callable, List, TypeVar
 
 from pygments import highlight
 from pygments.formatters import TerminalTrueColorFormatter
 from pygments.lexers import Python3TracebackLexer
 
+T = TypeVar("T")
+
 
 def singleton(class_: Any) -> Any:
     instances = {}
@@ -24,3 +28,68 @@ def colorful_error_trace(e: Exception) -> str:
             for line in traceback.format_tb(e.__traceback__)
         ]
     )
+
+
+def run_with_timeout(fn: Callable[[], T], timeout: float) -> T | None:
+    """
+    runs fn in a daemon thread; returns None if it does not finish in time
+    (the thread is abandoned, not killed); exceptions are re-raised
+    """
+    result: List[T] = []
+    error: List[BaseException] = []
+
+    def target() -> None:
+        try:
+            result.append(fn())
+        except BaseException as e:
+            error.append(e)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        return None
+    if error:
+        raise error[0]
+    return result[0]
+
+
+def run_in_process(fn: Callable[[], T], timeout: float) -> T | None:
+    """
+    runs fn in a forked process; returns None if it does not finish in time
+    (the process is killed, unlike the thread of run_with_timeout); exceptions
+    are re-raised; the result must be picklable; falls back to
+    run_with_timeout where fork is not available
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return run_with_timeout(fn, timeout)
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+
+    def target() -> None:
+        try:
+            sender.send((True, fn()))
+        except BaseException as e:
+            try:
+                sender.send((False, e))
+            except Exception:
+                sender.send((False, RuntimeError(repr(e))))
+
+    process = context.Process(target=target, daemon=True)
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            return None
+        try:
+            ok, value = receiver.recv()
+        except EOFError:
+            raise RuntimeError("worker process exited without a result")
+    finally:
+        process.kill()
+        process.join()
+        receiver.close()
+    if not ok:
+        raise value
+    result: T = value
+    return result
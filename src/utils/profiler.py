@@ -0,0 +1,203 @@
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from config import PROFILE_MAX_DEPTH, PROFILE_MIN_SHARE, PROFILE_TOP_ALLOCATIONS
+from logger import GlobalLogger
+from utils.meta import singleton
+
+logger = GlobalLogger()
+
+type FuncKey = Tuple[str, int, str]
+
+
+class _Stage:
+    """
+    one cProfile.Profile per stage name, enabled on every entry
+    (so e.g. the per-preset solve stages of a batch accumulate)
+    """
+
+    __slots__ = ("profile", "seconds", "calls", "memory_peak")
+
+    def __init__(self) -> None:
+        self.profile = cProfile.Profile()
+        self.seconds = 0.0
+        self.calls = 0
+        self.memory_peak = 0
+
+
+class Profiler:
+    """
+    per-stage cProfile (and optionally tracemalloc) around the pipeline;
+    stages may nest, the outer one is paused while the inner one runs,
+    so times are exclusive
+    dump() writes <prefix>.pstats, <prefix>.collapsed (flame graph input,
+    "stage;frame;...;frame microseconds" lines) and <prefix>.memory.txt
+    """
+
+    enabled: bool = False
+    prefix: str = "profile"
+    trace_memory: bool = False
+
+    _stages: Dict[str, _Stage]
+    _stack: List[Tuple[str, float, int]]
+
+    def __init__(self) -> None:
+        self._stages = {}
+        self._stack = []
+
+    def configure(self, prefix: str | None, trace_memory: bool = False) -> None:
+        self.enabled = prefix is not None
+        if prefix is not None:
+            self.prefix = prefix
+        self.trace_memory = self.enabled and trace_memory
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        if self._stack:
+            self._pause(self._stack[-1][0])
+        self._resume(name)
+        self._stages[name].calls += 1
+        try:
+            yield
+        finally:
+            self._pause(name)
+            self._stack.pop()
+            if self._stack:
+                outer = self._stack.pop()[0]
+                self._resume(outer)
+
+    def _resume(self, name: str) -> None:
+        stage = self._stages.setdefault(name, _Stage())
+        memory_start = 0
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        self._stack.append((name, time.perf_counter(), memory_start))
+        stage.profile.enable()
+
+    def _pause(self, name: str) -> None:
+        stage = self._stages[name]
+        stage.profile.disable()
+        _, started, memory_start = self._stack[-1]
+        stage.seconds += time.perf_counter() - started
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] - memory_start
+            stage.memory_peak = max(stage.memory_peak, peak)
+
+    def summary(self) -> List[str]:
+        lines = []
+        for name, stage in self._stages.items():
+            line = f"{name}: {stage.seconds:.4f}s in {stage.calls} call(s)"
+            if self.trace_memory:
+                line += f", peak {stage.memory_peak / 1024:.1f} KiB"
+            lines.append(line)
+        return lines
+
+    def dump(self) -> List[str]:
+        """
+        writes the profile files; returns their paths
+        """
+        if not self.enabled or not self._stages:
+            return []
+        directory = os.path.dirname(self.prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        paths = []
+
+        stats: pstats.Stats | None = None
+        for stage in self._stages.values():
+            if stats is None:
+                stats = pstats.Stats(stage.profile)
+            else:
+                stats.add(stage.profile)
+        assert stats is not None
+        path = f"{self.prefix}.pstats"
+        stats.dump_stats(path)
+        paths.append(path)
+
+        path = f"{self.prefix}.collapsed"
+        with open(path, "w") as f:
+            for name, stage in self._stages.items():
+                for stack, weight in collapsed_stacks(pstats.Stats(stage.profile)):
+                    f.write(f"{name};{stack} {weight}\n")
+        paths.append(path)
+
+        if self.trace_memory:
+            path = f"{self.prefix}.memory.txt"
+            snapshot = tracemalloc.take_snapshot()
+            with open(path, "w") as f:
+                f.write("\n".join(self.summary()) + "\n\n")
+                f.write(f"top {PROFILE_TOP_ALLOCATIONS} live allocations:\n")
+                for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                    f.write(f"{stat}\n")
+            paths.append(path)
+
+        for line in self.summary():
+            logger.info(f"profile {line}")
+        logger.info(f"profile written to {', '.join(paths)}")
+        return paths
+
+
+@singleton
+class GlobalProfiler(Profiler):
+    pass
+
+
+def _frame_label(func: FuncKey) -> str:
+    file, line, name = func
+    if file == "~":
+        return name
+    return f"{name} ({os.path.basename(file)}:{line})"
+
+
+def collapsed_stacks(stats: pstats.Stats) -> List[Tuple[str, int]]:
+    """
+    cProfile keeps caller -> callee edges only, so stacks are reconstructed
+    from the roots down, splitting a callee's time between its callers in
+    proportion to the cumulative time of each edge (the usual approximation);
+    branches under PROFILE_MIN_SHARE of the total (or deeper than
+    PROFILE_MAX_DEPTH) are dropped
+    """
+    raw = stats.stats  # type: ignore[attr-defined]
+    callees: Dict[FuncKey, List[Tuple[FuncKey, float]]] = {}
+    roots = []
+    for func, (_, _, _, _, callers) in raw.items():
+        known = [c for c in callers if c in raw]
+        if not known:
+            roots.append(func)
+        for caller in known:
+            callees.setdefault(caller, []).append((func, callers[caller][3]))
+    total = sum(raw[func][3] for func in roots)
+    min_time = total * PROFILE_MIN_SHARE
+
+    weights: Dict[str, int] = {}
+
+    def walk(func: FuncKey, path: List[FuncKey], share: float) -> None:
+        _, _, tottime, cumtime, _ = raw[func]
+        if cumtime * share < min_time or len(path) >= PROFILE_MAX_DEPTH:
+            return
+        path.append(func)
+        weight = int(tottime * share * 1e6)
+        if weight > 0:
+            stack = ";".join(_frame_label(f) for f in path)
+            weights[stack] = weights.get(stack, 0) + weight
+        for callee, edge_cumtime in callees.get(func, []):
+            callee_cumtime = raw[callee][3]
+            if callee in path or callee_cumtime <= 0:
+                continue
+            walk(callee, path, share * min(1.0, edge_cumtime / callee_cumtime))
+        path.pop()
+
+    for root in roots:
+        walk(root, [], 1.0)
+    return sorted(weights.items())
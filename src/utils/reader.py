@@ -1,23 +1,43 @@
 import json
 from io import TextIOWrapper
-from typing import Any, List
+from typing import Any, Iterator, List, Tuple
 
 import sympy as sp  # type: ignore
 
+from config import READER_CHUNK_SIZE
 from logger import GlobalLogger
-from utils.validation import to_sp_float
+from utils.validation import to_float, to_sp_float
 
 logger = GlobalLogger()
 
+_WHITESPACE = " \t\r\n"
+# longest literal or escape (\uXXXX) a chunk boundary can cut, minus one
+_MAX_CUT_TOKEN = 5
+
+
+def _truncated(e: json.JSONDecodeError, buf: str) -> bool:
+    """
+    whether decoding failed only because the item continues past the end of
+    buf (unterminated string, or an error within a token of its end)
+    """
+    return e.msg.startswith("Unterminated string") or e.pos >= len(buf) - _MAX_CUT_TOKEN
+
 
 class Preset:
+    __slots__ = ("name", "f_expr", "interval_l", "interval_r")
+
     name: str | None
     f_expr: str
-    interval_l: sp.Float
-    interval_r: sp.Float
+    # native floats when read with Reader(native_floats=True)
+    interval_l: sp.Float | float
+    interval_r: sp.Float | float
 
     def __init__(
-        self, name: str | None, f_expr: str, interval_l: sp.Float, interval_r: sp.Float
+        self,
+        name: str | None,
+        f_expr: str,
+        interval_l: sp.Float | float,
+        interval_r: sp.Float | float,
     ):
         self.name = name
         self.f_expr = f_expr
@@ -39,9 +59,17 @@ class Preset:
 
 class Reader:
     in_stream: TextIOWrapper | Any
+    native_floats: bool
 
-    def __init__(self, in_stream: TextIOWrapper | Any | str):
+    def __init__(
+        self, in_stream: TextIOWrapper | Any | str, native_floats: bool = False
+    ):
+        """
+        native_floats: store preset bounds as python floats instead of
+        PRECISION-digit sp.Float (much smaller, for large batches)
+        """
         self.in_stream = in_stream
+        self.native_floats = native_floats
 
     def parse_preset(self) -> Preset:
         logger.info(f"parsing preset from {self.in_stream}")
@@ -75,6 +103,124 @@ class Reader:
 
         return presets
 
+    def iter_presets(self, skip_invalid: bool = False) -> Iterator[Preset]:
+        """
+        streams presets one by one from either JSON Lines or a (possibly huge)
+        JSON array, which is decoded incrementally; errors are reported with
+        line numbers and, with skip_invalid, logged and skipped
+        """
+        logger.info(f"streaming presets from {self.in_stream}")
+        head = self.in_stream.read(READER_CHUNK_SIZE)
+        stripped = head.lstrip(_WHITESPACE)
+        if stripped.startswith("["):
+            items = self._iter_json_array(head)
+        else:
+            items = self._iter_json_lines(head)
+        for line, obj in items:
+            try:
+                if isinstance(obj, json.JSONDecodeError):
+                    raise ValueError(f"invalid JSON: {obj.msg}")
+                yield self.obj_to_preset(obj)
+            except ValueError as e:
+                if not skip_invalid:
+                    raise ValueError(f"line {line}: {e}")
+                logger.warning(f"line {line}: {e}; skipping")
+
+    def _iter_json_lines(self, head: str) -> Iterator[Tuple[int, Any]]:
+        tail = ""
+        line_no = 0
+        chunk = head
+        while chunk:
+            lines = (tail + chunk).split("\n")
+            tail = lines.pop()
+            for line in lines:
+                line_no += 1
+                yield from self._decode_line(line_no, line)
+            chunk = self.in_stream.read(READER_CHUNK_SIZE)
+        if tail:
+            yield from self._decode_line(line_no + 1, tail)
+
+    def _decode_line(self, line_no: int, line: str) -> Iterator[Tuple[int, Any]]:
+        if not line.strip():
+            return
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, e
+
+    def _iter_json_array(self, head: str) -> Iterator[Tuple[int, Any]]:
+        decoder = json.JSONDecoder()
+        buf = head
+        pos = buf.index("[") + 1
+        line_no = 1 + buf.count("\n", 0, pos)
+        while True:
+            # skip separators between items
+            start = pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE + ",":
+                pos += 1
+            line_no += buf.count("\n", start, pos)
+            if pos == len(buf):
+                buf, pos = self.in_stream.read(READER_CHUNK_SIZE), 0
+                if not buf:
+                    raise ValueError(f"line {line_no}: unexpected end of JSON array")
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                err_line = line_no + buf.count("\n", pos, e.pos)
+                if _truncated(e, buf):
+                    # the item may be split across chunks; read more and retry
+                    chunk = self.in_stream.read(READER_CHUNK_SIZE)
+                    if chunk:
+                        buf, pos = buf[pos:] + chunk, 0
+                        continue
+                # malformed: report it at once, and resume after it if skipped
+                yield err_line, e
+                buf, pos, end = self._skip_item(buf, pos)
+            else:
+                yield line_no, obj
+            line_no += buf.count("\n", pos, end)
+            pos = end
+
+    def _skip_item(self, buf: str, pos: int) -> Tuple[str, int, int]:
+        """
+        finds the end of the malformed array item starting at buf[pos] by
+        matching brackets outside strings, reading more chunks as needed
+        returns (buf, pos, end), buf possibly extended and pos moved with it
+        """
+        depth, in_string, escaped = 0, False, False
+        i = pos
+        while True:
+            if i == len(buf):
+                chunk = self.in_stream.read(READER_CHUNK_SIZE)
+                if not chunk:
+                    return buf, pos, i
+                buf, i, pos = buf[pos:] + chunk, i - pos, 0
+            c = buf[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == "\\":
+                    escaped = True
+                elif c == '"':
+                    in_string = False
+            elif c == '"':
+                in_string = True
+            elif c in "{[":
+                depth += 1
+            elif c in "}]":
+                if depth == 0:
+                    # the closing bracket of the array
+                    return buf, pos, i
+                depth -= 1
+                if depth == 0:
+                    return buf, pos, i + 1
+            elif c == "," and depth == 0:
+                return buf, pos, i
+            i += 1
+
     def obj_to_preset(self, obj: Any) -> Preset:
         if not isinstance(obj, dict):
             raise ValueError(f"preset {obj} is not an object")
@@ -93,6 +239,8 @@ class Reader:
         if not isinstance(interval_r, (int, float)) and not isinstance(interval_r, str):
             raise ValueError(f"preset {obj}: 'interval_r' must be a number or string")
 
+        if self.native_floats:
+            return Preset(name, f_expr, to_float(interval_l), to_float(interval_r))
         return Preset(name, f_expr, to_sp_float(interval_l), to_sp_float(interval_r))
 
     def destroy(self) -> None:
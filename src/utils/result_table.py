@@ -0,0 +1,103 @@
+from array import array
+from typing import Dict, Iterator, List, Sequence
+
+from solvers.base_solver import Solution
+from utils.integrals import IntegralExpr
+
+
+class ResultTable:
+    """
+    array-backed (column-wise, native floats) storage of many solutions;
+    function strings are interned so repeated functions cost one index each;
+    extra_columns are additional float columns (e.g. sweep parameters)
+    """
+
+    functions: List[str]
+    _function_ids: Dict[str, int]
+
+    function_id: array  # type: ignore[type-arg]
+    interval_l: array  # type: ignore[type-arg]
+    interval_r: array  # type: ignore[type-arg]
+    value: array  # type: ignore[type-arg]
+    error_rate: array  # type: ignore[type-arg]
+    interval_count: array  # type: ignore[type-arg]
+    evaluations: array  # type: ignore[type-arg]
+    converged: array  # type: ignore[type-arg]
+    extra: Dict[str, array]  # type: ignore[type-arg]
+
+    def __init__(self, extra_columns: Sequence[str] = ()) -> None:
+        self.functions = []
+        self._function_ids = {}
+        self.function_id = array("l")
+        self.interval_l = array("d")
+        self.interval_r = array("d")
+        self.value = array("d")
+        self.error_rate = array("d")
+        self.interval_count = array("q")
+        self.evaluations = array("q")
+        self.converged = array("b")
+        self.extra = {name: array("d") for name in extra_columns}
+
+    def append(
+        self,
+        f_str: str,
+        interval_l: float,
+        interval_r: float,
+        solution: Solution,
+        extra: Sequence[float] = (),
+    ) -> None:
+        if len(extra) != len(self.extra):
+            raise ValueError(
+                f"expected {len(self.extra)} extra values, got {len(extra)}"
+            )
+        fid = self._function_ids.get(f_str)
+        if fid is None:
+            fid = len(self.functions)
+            self._function_ids[f_str] = fid
+            self.functions.append(f_str)
+        self.function_id.append(fid)
+        self.interval_l.append(float(interval_l))
+        self.interval_r.append(float(interval_r))
+        self.value.append(float(solution.value))
+        self.error_rate.append(float(solution.error_rate))
+        self.interval_count.append(solution.interval_count)
+        self.evaluations.append(solution.evaluations)
+        self.converged.append(solution.converged)
+        for column, v in zip(self.extra.values(), extra):
+            column.append(float(v))
+
+    def append_solution(self, integral: IntegralExpr, solution: Solution) -> None:
+        self.append(
+            integral.fn.f_str(), integral.interval_l, integral.interval_r, solution
+        )
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def __getitem__(self, i: int) -> Solution:
+        return Solution(
+            self.value[i],
+            self.interval_count[i],
+            self.error_rate[i],
+            converged=bool(self.converged[i]),
+            evaluations=self.evaluations[i],
+        )
+
+    def records(self) -> Iterator[Dict[str, str]]:
+        """
+        rows in the same shape as writer.solution_record, extra columns appended
+        """
+        for i in range(len(self)):
+            record = {
+                "function": self.functions[self.function_id[i]],
+                "interval_l": str(self.interval_l[i]),
+                "interval_r": str(self.interval_r[i]),
+                "result": str(self.value[i]),
+                "error": str(self.error_rate[i]),
+                "iterations": str(self.interval_count[i]),
+                "evaluations": str(self.evaluations[i]),
+                "converged": str(bool(self.converged[i])).lower(),
+            }
+            for name, column in self.extra.items():
+                record[name] = str(column[i])
+            yield record
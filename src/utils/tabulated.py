@@ -0,0 +1,313 @@
+import csv
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from config import TABULATED_CHUNK_SIZE
+
+type Chunk = Tuple[np.ndarray, np.ndarray]
+
+
+class TabulatedFunction:
+    """
+    stands in for FunctionExpr in a TabulatedIntegral: names the samples for
+    writers (f_str) but can not be evaluated
+    """
+
+    name: str
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def f_str(self) -> str:
+        return self.name
+
+    def __str__(self) -> str:
+        return f"TabulatedFunction({self.name})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class TabulatedIntegral:
+    """
+    integral over sampled data (x_i, y_i) with strictly increasing x;
+    .npy and raw float64 files are memory-mapped and read in chunks of views,
+    CSV (not mappable) is parsed in chunks; either x is stored next to y or
+    the samples are uniform, x_i = x0 + i * dx
+    """
+
+    fn: TabulatedFunction
+    interval_l: float
+    interval_r: float
+    sample_count: int
+
+    _ys: np.ndarray | None  # memory-mapped (possibly strided) views
+    _xs: np.ndarray | None
+    _csv_path: str | None = None
+    _delimiter: str = ","
+    _x0: float
+    _dx: float
+
+    def __init__(
+        self,
+        name: str,
+        ys: np.ndarray | None,
+        xs: np.ndarray | None = None,
+        x0: float = 0.0,
+        dx: float = 1.0,
+    ) -> None:
+        self.fn = TabulatedFunction(name)
+        self._ys, self._xs = ys, xs
+        self._x0, self._dx = x0, dx
+        if ys is None:
+            return
+        if ys.ndim != 1 or (xs is not None and xs.shape != ys.shape):
+            raise ValueError("samples must be one y column (and one x column)")
+        if xs is None and not dx > 0:
+            raise ValueError("dx must be greater than 0")
+        self.sample_count = len(ys)
+        if self.sample_count < 2:
+            raise ValueError("at least 2 samples are required")
+        if xs is None:
+            self.interval_l, self.interval_r = x0, x0 + dx * (self.sample_count - 1)
+        else:
+            self.interval_l, self.interval_r = float(xs[0]), float(xs[-1])
+
+    @classmethod
+    def from_npy(
+        cls, path: str, x0: float = 0.0, dx: float = 1.0
+    ) -> "TabulatedIntegral":
+        """
+        shape (n,) for uniform samples or (n, 2) for x, y columns
+        """
+        data = np.load(path, mmap_mode="r")
+        return cls._from_array(path, data, x0, dx)
+
+    @classmethod
+    def from_raw(
+        cls, path: str, columns: int = 1, x0: float = 0.0, dx: float = 1.0
+    ) -> "TabulatedIntegral":
+        """
+        native float64 binary; columns=2 for interleaved x, y pairs
+        """
+        if columns not in (1, 2):
+            raise ValueError("raw data must have 1 (y) or 2 (x, y) columns")
+        data: np.ndarray = np.memmap(path, dtype=np.float64, mode="r")
+        if len(data) % columns != 0:
+            raise ValueError(f"{path}: size is not a multiple of {columns} float64")
+        if columns == 2:
+            data = data.reshape(-1, 2)
+        return cls._from_array(path, data, x0, dx)
+
+    @classmethod
+    def _from_array(
+        cls, path: str, data: np.ndarray, x0: float, dx: float
+    ) -> "TabulatedIntegral":
+        name = f"data({os.path.basename(path)})"
+        if data.ndim == 1:
+            return cls(name, data, x0=x0, dx=dx)
+        if data.ndim == 2 and data.shape[1] == 2:
+            # column views into the mapping, no copy
+            return cls(name, data[:, 1], data[:, 0])
+        raise ValueError(f"{path}: expected shape (n,) or (n, 2), got {data.shape}")
+
+    @classmethod
+    def from_csv(
+        cls, path: str, x0: float = 0.0, dx: float = 1.0, delimiter: str = ","
+    ) -> "TabulatedIntegral":
+        """
+        one (y) or two (x, y) numeric columns; a non-numeric first row is
+        taken as a header; bounds are found with one streaming pass
+        """
+        integral = cls(f"data({os.path.basename(path)})", None, x0=x0, dx=dx)
+        integral._csv_path = path
+        integral._delimiter = delimiter
+        count, first, last = 0, 0.0, 0.0
+        for xs, _ in integral.chunks():
+            if count == 0:
+                first = float(xs[0])
+            count += len(xs)
+            last = float(xs[-1])
+        if count < 2:
+            raise ValueError("at least 2 samples are required")
+        integral.sample_count = count
+        integral.interval_l, integral.interval_r = first, last
+        return integral
+
+    def chunks(self, chunk_size: int = TABULATED_CHUNK_SIZE) -> Iterator[Chunk]:
+        """
+        consecutive (xs, ys) pieces of at most chunk_size samples; raises
+        ValueError if x is not strictly increasing
+        """
+        source = (
+            self._csv_chunks(chunk_size) if self._csv_path else self._chunks(chunk_size)
+        )
+        last_x = -np.inf
+        for xs, ys in source:
+            if xs[0] <= last_x or np.any(np.diff(xs) <= 0):
+                raise ValueError(f"{self.fn.f_str()}: x must be strictly increasing")
+            last_x = xs[-1]
+            yield xs, ys
+
+    def _chunks(self, chunk_size: int) -> Iterator[Chunk]:
+        assert self._ys is not None
+        for start in range(0, self.sample_count, chunk_size):
+            stop = min(start + chunk_size, self.sample_count)
+            if self._xs is None:
+                xs = self._x0 + self._dx * np.arange(start, stop, dtype=np.float64)
+            else:
+                xs = self._xs[start:stop]
+            yield xs, self._ys[start:stop]
+
+    def _csv_chunks(self, chunk_size: int) -> Iterator[Chunk]:
+        assert self._csv_path is not None
+        index = 0
+        with open(self._csv_path, "r", newline="") as f:
+            rows: List[List[float]] = []
+            for line_no, row in enumerate(csv.reader(f, delimiter=self._delimiter)):
+                if not row:
+                    continue
+                try:
+                    rows.append([float(v) for v in row])
+                except ValueError:
+                    if line_no == 0:
+                        continue  # header
+                    raise ValueError(
+                        f"{self._csv_path}:{line_no + 1}: invalid row {row}"
+                    )
+                if len(rows) == chunk_size:
+                    yield self._csv_chunk(rows, index)
+                    index += len(rows)
+                    rows = []
+            if rows:
+                yield self._csv_chunk(rows, index)
+
+    def _csv_chunk(self, rows: List[List[float]], start: int) -> Chunk:
+        data = np.array(rows, dtype=np.float64)
+        if data.ndim != 2 or data.shape[1] not in (1, 2):
+            raise ValueError(f"{self._csv_path}: expected 1 (y) or 2 (x, y) columns")
+        if data.shape[1] == 2:
+            return data[:, 0], data[:, 1]
+        xs = self._x0 + self._dx * np.arange(start, start + len(data), dtype=np.float64)
+        return xs, data[:, 0]
+
+    def __str__(self) -> str:
+        fn, interval_l, interval_r = self.fn, self.interval_l, self.interval_r
+        return f"TabulatedIntegral({fn=}, {interval_l=}, {interval_r=})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class SampleAccumulator:
+    """
+    streaming quadrature rule over samples fed chunk by chunk; the samples a
+    rule can not use yet (e.g. half of a simpson panel) are carried over
+    """
+
+    WIDTH = 1  # intervals per panel of the rule
+
+    total: float
+    _xs: np.ndarray
+    _ys: np.ndarray
+
+    def __init__(self) -> None:
+        self.total = 0.0
+        self._xs = np.empty(0)
+        self._ys = np.empty(0)
+
+    def feed(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """
+        the chunk itself is consumed in place (views only); just the panel
+        that straddles the previous chunk is assembled from the carried
+        samples and the first WIDTH samples of this one
+        """
+        carried = len(self._xs)
+        if carried > 0:
+            head = min(self.WIDTH, len(xs))
+            bridge_xs = np.concatenate((self._xs, xs[:head]))
+            bridge_ys = np.concatenate((self._ys, ys[:head]))
+            used = self._consume(bridge_xs, bridge_ys)
+            if used < carried or head == len(xs):
+                self._carry(bridge_xs[used:], bridge_ys[used:])
+                return
+            # the sample at bridge index `used` starts the next panel
+            xs, ys = xs[used - carried :], ys[used - carried :]
+        used = self._consume(xs, ys)
+        self._carry(xs[used:], ys[used:])
+
+    def _carry(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        # copies of at most WIDTH samples, so the chunk can be released
+        self._xs, self._ys = xs.copy(), ys.copy()
+
+    def result(self) -> float:
+        return self.total + self._finish(self._xs, self._ys)
+
+    def _consume(self, xs: np.ndarray, ys: np.ndarray) -> int:
+        """
+        adds the panels fully inside xs to total; returns the index of the
+        first sample to carry over
+        """
+        raise NotImplementedError()
+
+    def _finish(self, xs: np.ndarray, ys: np.ndarray) -> float:
+        return 0.0
+
+
+class RectAccumulator(SampleAccumulator):
+    right: bool
+
+    def __init__(self, right: bool = False) -> None:
+        super().__init__()
+        self.right = right
+
+    def _consume(self, xs: np.ndarray, ys: np.ndarray) -> int:
+        if len(xs) < 2:
+            return 0
+        heights = ys[1:] if self.right else ys[:-1]
+        self.total += float(np.sum(np.diff(xs) * heights))
+        return len(xs) - 1
+
+
+class TrapAccumulator(SampleAccumulator):
+    def _consume(self, xs: np.ndarray, ys: np.ndarray) -> int:
+        if len(xs) < 2:
+            return 0
+        self.total += float(np.sum(np.diff(xs) * (ys[:-1] + ys[1:]))) / 2
+        return len(xs) - 1
+
+
+class SimpsonAccumulator(SampleAccumulator):
+    """
+    simpson's rule for (possibly) non-uniform x, panel by panel of two
+    intervals; an odd last interval is closed with the trapezoid rule
+    """
+
+    WIDTH = 2
+
+    def _consume(self, xs: np.ndarray, ys: np.ndarray) -> int:
+        m = (len(xs) - 1) // 2
+        if m == 0:
+            return 0
+        x0, x1, x2 = xs[0 : 2 * m : 2], xs[1 : 2 * m : 2], xs[2 : 2 * m + 1 : 2]
+        y0, y1, y2 = ys[0 : 2 * m : 2], ys[1 : 2 * m : 2], ys[2 : 2 * m + 1 : 2]
+        h0, h1 = x1 - x0, x2 - x1
+        self.total += float(
+            np.sum(
+                (h0 + h1)
+                / 6
+                * (
+                    (2 - h1 / h0) * y0
+                    + (h0 + h1) ** 2 / (h0 * h1) * y1
+                    + (2 - h0 / h1) * y2
+                )
+            )
+        )
+        return 2 * m
+
+    def _finish(self, xs: np.ndarray, ys: np.ndarray) -> float:
+        if len(xs) < 2:
+            return 0.0
+        return float((xs[1] - xs[0]) * (ys[0] + ys[1]) / 2)
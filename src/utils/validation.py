@@ -38,4 +38,7 @@ def to_sp_float(s: Any) -> sp.Float:
         return s
     if type(s) == str:
         s = s.replace(",", ".")
+        # sympy prints infinities as oo
+        if s.strip() in {"oo", "+oo", "-oo"}:
+            s = s.replace("oo", "inf")
     return sp.Float(s, PRECISION)
@@ -1,10 +1,12 @@
+import csv
 import json
 import os
 from enum import Enum
 from io import TextIOWrapper
-from typing import Any, List
+from typing import Any, Dict, Iterable, List
 
 
+from config import WRITER_FLUSH_EVERY
 from logger import GlobalLogger
 from solvers.base_solver import Solution
 from utils.integrals import IntegralExpr
@@ -16,17 +18,49 @@ logger = GlobalLogger()
 class OutputFormat(Enum):
     JSON = "json"
     PLAIN = "plain"
+    JSONL = "jsonl"
+    CSV = "csv"
+
+
+def solution_record(integral: IntegralExpr, result: Solution) -> Dict[str, str]:
+    return make_record(
+        integral.fn.f_str(), integral.interval_l, integral.interval_r, result
+    )
+
+
+def make_record(
+    f_str: str, interval_l: Any, interval_r: Any, result: Solution
+) -> Dict[str, str]:
+    return {
+        "function": f_str,
+        "interval_l": str(interval_l),
+        "interval_r": str(interval_r),
+        "result": str(result.value),
+        "error": str(result.error_rate),
+        "iterations": str(result.interval_count),
+        "evaluations": str(result.evaluations),
+        "converged": str(result.converged).lower(),
+    }
 
 
 class ResWriter:
     out_stream: TextIOWrapper | Any
     file_path: str | None = None
+    flush_every: int
+
+    _writers: Dict[OutputFormat, "ResWriter"]
 
-    def __init__(self, out_stream: TextIOWrapper | Any | str):
+    def __init__(
+        self,
+        out_stream: TextIOWrapper | Any | str,
+        flush_every: int = WRITER_FLUSH_EVERY,
+    ):
         if type(out_stream) == str:
             self.file_path = out_stream
             out_stream = self._get_out_stream(out_stream)
         self.out_stream = out_stream
+        self.flush_every = max(1, flush_every)
+        self._writers = {}
 
     def _get_out_stream(self, file_path: str) -> TextIOWrapper | Any:
         if not file_path:
@@ -37,21 +71,54 @@ class ResWriter:
             raise PermissionError(f"no write permission for {file_path}")
         return open(file_path, "w")
 
+    def _get_writer(self, format: OutputFormat) -> "ResWriter":
+        # writers are kept per format so that streaming ones retain their buffers
+        res_writer = self._writers.get(format)
+        if res_writer is None:
+            if format == OutputFormat.JSON:
+                res_writer = JsonWriter(self.out_stream)
+            elif format == OutputFormat.JSONL:
+                res_writer = JsonLinesWriter(self.out_stream, self.flush_every)
+            elif format == OutputFormat.CSV:
+                res_writer = CsvWriter(self.out_stream, self.flush_every)
+            else:
+                res_writer = PlainWriter(self.out_stream)
+            logger.debug("using writer", res_writer.__class__.__name__)
+            self._writers[format] = res_writer
+        return res_writer
+
     def write_solution(
         self,
         integral: IntegralExpr,
         result: Solution,
         format: OutputFormat = OutputFormat.PLAIN,
     ) -> None:
-        res_writer: ResWriter
-        if format == OutputFormat.JSON:
-            res_writer = JsonWriter(self.out_stream)
-        else:
-            res_writer = PlainWriter(self.out_stream)
-        logger.debug("using writer", res_writer.__class__.__name__)
-        res_writer.write_solution(integral, result)
+        self._get_writer(format).write_solution(integral, result)
+
+    def write_record(
+        self, record: Dict[str, str], format: OutputFormat = OutputFormat.PLAIN
+    ) -> None:
+        self._get_writer(format).write_record(record)
+
+    def write_records(
+        self,
+        records: Iterable[Dict[str, str]],
+        format: OutputFormat = OutputFormat.PLAIN,
+    ) -> None:
+        """
+        e.g. writer.write_records(result_table.records(), format)
+        """
+        res_writer = self._get_writer(format)
+        for record in records:
+            res_writer.write_record(record)
+
+    def flush(self) -> None:
+        for res_writer in self._writers.values():
+            res_writer.flush()
+        self.out_stream.flush()
 
     def destroy(self) -> None:
+        self.flush()
         self.out_stream.close()
 
 
@@ -62,13 +129,20 @@ class PlainWriter(ResWriter):
         result: Solution,
         format: OutputFormat = OutputFormat.PLAIN,
     ) -> None:
-        self.out_stream.write(f"Function: {integral.fn.f_str()}\n")
+        self.write_record(solution_record(integral, result))
+
+    def write_record(
+        self, record: Dict[str, str], format: OutputFormat = OutputFormat.PLAIN
+    ) -> None:
+        self.out_stream.write(f"Function: {record['function']}\n")
         self.out_stream.write(
-            f"Interval: [{integral.interval_l}, {integral.interval_r}]\n"
+            f"Interval: [{record['interval_l']}, {record['interval_r']}]\n"
         )
-        self.out_stream.write(f"Result: {result.value}\n")
-        self.out_stream.write(f"Error: {result.error_rate}\n")
-        self.out_stream.write(f"Iterations: {result.interval_count}\n")
+        self.out_stream.write(f"Result: {record['result']}\n")
+        self.out_stream.write(f"Error: {record['error']}\n")
+        self.out_stream.write(f"Iterations: {record['iterations']}\n")
+        self.out_stream.write(f"Evaluations: {record['evaluations']}\n")
+        self.out_stream.write(f"Converged: {record['converged']}\n")
         self.out_stream.flush()
 
 
@@ -79,21 +153,98 @@ class JsonWriter(ResWriter):
         result: Solution,
         format: OutputFormat = OutputFormat.PLAIN,
     ) -> None:
+        self.write_record(solution_record(integral, result))
 
-        obj = {
-            "function": integral.fn.f_str(),
-            "interval_l": str(integral.interval_l),
-            "interval_r": str(integral.interval_r),
-            "result": str(result.value),
-            "error": str(result.error_rate),
-            "iterations": str(result.interval_count),
-        }
-        logger.debug("dumping json", obj)
+    def write_record(
+        self, record: Dict[str, str], format: OutputFormat = OutputFormat.PLAIN
+    ) -> None:
+        logger.debug("dumping json", record)
 
         json.dump(
-            obj,
+            record,
             self.out_stream,
             indent=4,
         )
         self.out_stream.write("\n")
         self.out_stream.flush()
+
+
+class StreamingWriter(ResWriter):
+    """
+    writes one compact record per solution; records are buffered and
+    flushed every `flush_every` solutions (and on flush()/destroy())
+    """
+
+    _buffer: List[str]
+    _pending: int
+
+    def __init__(
+        self,
+        out_stream: TextIOWrapper | Any | str,
+        flush_every: int = WRITER_FLUSH_EVERY,
+    ):
+        super().__init__(out_stream, flush_every)
+        self._buffer = []
+        self._pending = 0
+
+    def _format_record(self, record: Dict[str, str]) -> str:
+        raise NotImplementedError
+
+    def write_solution(
+        self,
+        integral: IntegralExpr,
+        result: Solution,
+        format: OutputFormat = OutputFormat.PLAIN,
+    ) -> None:
+        self.write_record(solution_record(integral, result))
+
+    def write_record(
+        self, record: Dict[str, str], format: OutputFormat = OutputFormat.PLAIN
+    ) -> None:
+        self._buffer.append(self._format_record(record))
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.out_stream.write("".join(self._buffer))
+            self._buffer.clear()
+        self._pending = 0
+        self.out_stream.flush()
+
+
+class JsonLinesWriter(StreamingWriter):
+    def _format_record(self, record: Dict[str, str]) -> str:
+        return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+class _LineBuffer:
+    line: str = ""
+
+    def write(self, s: str) -> None:
+        self.line = s
+
+
+class CsvWriter(StreamingWriter):
+    _columns: List[str] | None = None
+    _line: _LineBuffer
+    _csv: Any
+
+    def __init__(
+        self,
+        out_stream: TextIOWrapper | Any | str,
+        flush_every: int = WRITER_FLUSH_EVERY,
+    ):
+        super().__init__(out_stream, flush_every)
+        self._line = _LineBuffer()
+        self._csv = csv.writer(self._line, lineterminator="\n")
+
+    def _format_record(self, record: Dict[str, str]) -> str:
+        header = ""
+        if self._columns is None:
+            self._columns = list(record.keys())
+            self._csv.writerow(self._columns)
+            header = self._line.line
+        self._csv.writerow([record.get(c, "") for c in self._columns])
+        return header + self._line.line